@@ -0,0 +1,162 @@
+import math
+import re
+import json
+from fractions import Fraction
+from . import sink
+
+gauge_groups = ['SU2', 'SU3', 'G2', 'SO7', 'SO8', 'F4', 'E6', 'E7', 'E8']
+
+#Compact statistics of good polytopes: histograms of h11, gauge groups by box and moments, unweighted and weighted
+#Two of them are merged in O(number of bins), independently of the number of samples
+#The moments with w2 are for the confidence interval of the weighted mean h11 in run_control.py
+def new_stats():
+    return {'h11': {}, 'wh11': {}, 'boxes': {}, 'moments': {'n': 0, 'h11': 0, 'h11_2': 0, 'w': 0.0, 'w2': 0.0, 'wh11': 0.0, 'wh11_2': 0.0, 'w2h11': 0.0, 'w2h11_2': 0.0}}
+
+def new_box():
+    return {'samples': 0, 'good': 0, 'w': 0.0, 'gauge': [0] * len(gauge_groups), 'wgauge': [0.0] * len(gauge_groups), 'gauge_good': 0, 'gauge_w': 0.0}
+
+#Add one good polytope of the box, gauge is the dictionary of determine_gauge or None
+def update(stats, box, h11, gauge = None, weight = 1):
+    weight = float(weight)
+    stats['h11'][h11] = stats['h11'].get(h11, 0) + 1
+    stats['wh11'][h11] = stats['wh11'].get(h11, 0.0) + weight
+    m = stats['moments']
+    m['n'] += 1
+    m['h11'] += h11
+    m['h11_2'] += h11 ** 2
+    m['w'] += weight
+    m['w2'] += weight ** 2
+    m['wh11'] += weight * h11
+    m['wh11_2'] += weight * h11 ** 2
+    m['w2h11'] += weight ** 2 * h11
+    m['w2h11_2'] += weight ** 2 * h11 ** 2
+    b = stats['boxes'].setdefault(box, new_box())
+    b['samples'] += 1
+    b['good'] += 1
+    b['w'] += weight
+    if gauge is not None:
+        for i, g in enumerate(gauge_groups):
+            b['gauge'][i] += gauge[g]
+            b['wgauge'][i] += weight * gauge[g]
+        b['gauge_good'] += 1
+        b['gauge_w'] += weight
+    return stats
+
+#Add many good polytopes of the box without gauge groups, used by the vectorized 2d Monte Carlo in polygon.py
+def update_many(stats, box, h11s, weights):
+    import numpy as np
+    h11s = np.asarray(h11s, dtype = np.int64)
+    weights = np.asarray(weights, dtype = float)
+    values, inverse = np.unique(h11s, return_inverse = True)
+    counts = np.bincount(inverse, minlength = len(values))
+    sums = np.bincount(inverse, weights, minlength = len(values))
+    for h11, count, weight in zip(values.tolist(), counts.tolist(), sums.tolist()):
+        stats['h11'][h11] = stats['h11'].get(h11, 0) + count
+        stats['wh11'][h11] = stats['wh11'].get(h11, 0.0) + weight
+    m = stats['moments']
+    m['n'] += len(h11s)
+    m['h11'] += int(h11s.sum())
+    m['h11_2'] += int((h11s ** 2).sum())
+    m['w'] += float(weights.sum())
+    m['w2'] += float((weights ** 2).sum())
+    m['wh11'] += float((weights * h11s).sum())
+    m['wh11_2'] += float((weights * h11s ** 2).sum())
+    m['w2h11'] += float((weights ** 2 * h11s).sum())
+    m['w2h11_2'] += float((weights ** 2 * h11s ** 2).sum())
+    b = stats['boxes'].setdefault(box, new_box())
+    b['samples'] += len(h11s)
+    b['good'] += len(h11s)
+    b['w'] += float(weights.sum())
+    return stats
+
+#Add samples rejected by checkn
+def update_rejected(stats, box, n = 1):
+    stats['boxes'].setdefault(box, new_box())['samples'] += n
+    return stats
+
+def merge(a, b):
+    merged = new_stats()
+    for key in ['h11', 'wh11']:
+        for s in [a, b]:
+            for h11, count in s[key].items():
+                merged[key][h11] = merged[key].get(h11, 0) + count
+    for key in merged['moments']:
+        merged['moments'][key] = a['moments'][key] + b['moments'][key]
+    for s in [a, b]:
+        for box, c in s['boxes'].items():
+            m = merged['boxes'].setdefault(box, new_box())
+            for key in ['samples', 'good', 'w', 'gauge_good', 'gauge_w']:
+                m[key] += c[key]
+            for key in ['gauge', 'wgauge']:
+                m[key] = [x + y for x, y in zip(m[key], c[key])]
+    return merged
+
+#json keys are strings, the h11 keys are converted back when loading
+def save(stats, filename):
+    with open(filename, 'w') as file:
+        json.dump(stats, file)
+
+def load(filename):
+    with open(filename, 'r') as file:
+        return restore(json.load(file))
+
+#Statistics read from json, moments missing in older files are 0
+def restore(stats):
+    for key in ['h11', 'wh11']:
+        stats[key] = {int(h11): count for h11, count in stats[key].items()}
+    for key, value in new_stats()['moments'].items():
+        stats['moments'].setdefault(key, value)
+    return stats
+
+#Read the output of fix_check.run or run_control.run_box, the box is taken from the metadata line if it is not given, or else is the file name
+#The output can be in either format of sink.py, and in several parts
+#Lines are like "12: (-6,-6,1)(-6,19,-6)(3,4,5)(1,2,-6) 4 h11=35 weight=1/2"
+def read_output(filename, box = None, stats = None):
+    if stats is None:
+        stats = new_stats()
+    sample = re.compile(r'^(\d+): (\S+) (\d+) h11=(\d+)(?: weight=(\S+))?')
+    samples, good = 0, 0
+    for line in sink.read_records(filename):
+        match = sample.match(line)
+        if match:
+            weight = Fraction(match.group(5)) if match.group(5) else 1
+            update(stats, filename if box is None else box, int(match.group(4)), weight = weight)
+            good += 1
+            continue
+        if line.startswith('metadata:') and box is None:
+            box = re.search(r"'box': '([^']*)'", line).group(1)
+        for pattern in [r'^para:totN=(\d+)', r"^estimates:\{'samples': (\d+)"]:
+            total = re.search(pattern, line)
+            if total:
+                samples = int(total.group(1))
+    if samples > good:
+        update_rejected(stats, filename if box is None else box, samples - good)
+    return stats
+
+#Mean and standard deviation of h11, acceptance and mean number of each gauge group per polytope in each box
+def summary(stats):
+    m = stats['moments']
+    result = {'good': m['n']}
+    if m['n'] > 0:
+        mean = m['h11'] / m['n']
+        wmean = m['wh11'] / m['w']
+        result['h11'] = (mean, math.sqrt(max(m['h11_2'] / m['n'] - mean ** 2, 0)))
+        result['weighted_h11'] = (wmean, math.sqrt(max(m['wh11_2'] / m['w'] - wmean ** 2, 0)))
+    boxes = {}
+    for box, b in stats['boxes'].items():
+        boxes[box] = {'samples': b['samples'], 'good': b['good'], 'acceptance': b['good'] / b['samples'] if b['samples'] else 0}
+        if b['gauge_good'] > 0:
+            boxes[box]['gauge'] = {g: b['gauge'][i] / b['gauge_good'] for i, g in enumerate(gauge_groups)}
+            boxes[box]['weighted_gauge'] = {g: b['wgauge'][i] / b['gauge_w'] for i, g in enumerate(gauge_groups)}
+    result['boxes'] = boxes
+    return result
+
+#Normalized distribution of h11, {h11: fraction}
+def distribution(stats, weighted = True):
+    hist = stats['wh11'] if weighted else stats['h11']
+    total = sum(hist.values())
+    return {h11: hist[h11] / total for h11 in sorted(hist)}
+
+if __name__ == '__main__':
+    from .cli import aggregate_main
+    aggregate_main()
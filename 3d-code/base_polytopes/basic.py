@@ -1,10 +1,10 @@
 import numpy as np
 from math import gcd
-from scipy.spatial import ConvexHull
+from . import kernels
 
-# Determine the gcd of components for a given vertex
+# Determine the gcd of components for a given vertex, in any dimension
 def divisor(v):
-    return gcd(int(v[0]), int(v[1]), int(v[2]))
+    return gcd(*[int(x) for x in v])
 
 # Control the error
 def sign(x):
@@ -37,6 +37,9 @@ def NotWrongSide(v1, v2, v3, v4, p):
 
 #Determine where a point is inside a given polytope. If the point is on a facet, still return True
 def insiden(vertices, facets, point):
+    result = kernels.inside(vertices, facets, point, False)
+    if result is not None:
+        return result
     for i in range(len(facets)):
         # Check whether point and another point(test point) in the polytope are in two sides of a facet
         p = 999
@@ -54,6 +57,9 @@ def insiden(vertices, facets, point):
 
 #Determine where a point is inside a given polytope. If the point is on a facet, return False
 def interiorn(vertices,facets,point):
+    result = kernels.inside(vertices, facets, point, True)
+    if result is not None:
+        return result
     for i in range(len(facets)):
         p = 999
         for j in range(len(vertices)):
@@ -68,6 +74,7 @@ def interiorn(vertices,facets,point):
     return True
 
 if __name__ == '__main__':
+    from scipy.spatial import ConvexHull
     print('----------test basic.py----------')
     #test codes
     v1 = np.array([-6, -6, -6], dtype = object)
@@ -1,13 +1,13 @@
 import numpy as np
-from scipy.spatial import ConvexHull
-from basic import coplanar, interiorn, cross
-from solve3 import solve_lattice
+from .basic import coplanar, interiorn, cross
+from .lattice_hull import lattice_hull_points
 import math
 
 def primitive(v):
-    return math.gcd(int(v[0]), int(v[1]), int(v[2])) == 1
+    return math.gcd(*[int(x) for x in v]) == 1
 
 def checkn(vlist, open_out_flag = False):
+    from scipy.spatial import ConvexHull
     if len(vlist) <= 3:
         if open_out_flag:
             print('list too short')
@@ -49,7 +49,7 @@ def checkn(vlist, open_out_flag = False):
         if open_out_flag:
             print('Origin not in the original interior')
         return False
-    solutions = solve_lattice(vlist,6)
+    solutions = lattice_hull_points(vlist, 6)
     if len(solutions) < 4:
         if open_out_flag:
             print('Solution list too short')
@@ -89,6 +89,7 @@ def checkn(vlist, open_out_flag = False):
     return True
 
 def checkn_non_primitive(vlist,open_out_flag=False):
+    from scipy.spatial import ConvexHull
     if len(vlist) <= 3:
         if open_out_flag:
             print('list too short')
@@ -124,7 +125,7 @@ def checkn_non_primitive(vlist,open_out_flag=False):
         if open_out_flag:
             print('Origin not in the original interior')
         return False
-    solutions = solve_lattice(vlist,6)
+    solutions = lattice_hull_points(vlist, 6)
     if len(solutions) < 4:
         if open_out_flag:
             print('Solution list too short')
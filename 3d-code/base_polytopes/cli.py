@@ -0,0 +1,206 @@
+import argparse
+import multiprocessing
+
+#Command line tools, each command only imports the modules it uses so that a worker starts quickly
+
+#Options of the output written by sink.py
+def add_output_arguments(parser):
+    parser.add_argument('--format', choices = ['text', 'binary'], default = 'text', help = 'text lines as before, or binary records with a checksum')
+    parser.add_argument('--compress', action = 'store_true', help = 'gzip the output')
+    parser.add_argument('--rotate-mb', type = float, default = None, help = 'continue the output in a new file after this size in MB')
+
+def output_options(args):
+    rotate_bytes = None if args.rotate_mb is None else int(args.rotate_mb * 2 ** 20)
+    return {'format': args.format, 'compress': args.compress, 'rotate_bytes': rotate_bytes}
+
+def montecarlo_main(argv = None):
+    parser = argparse.ArgumentParser(prog = 'bp-montecarlo', description = 'Monte Carlo of random polytopes in the box dual to a G-polytope')
+    parser.add_argument('--polytopes', default = '3d-G-polytopes.txt', help = 'list of G-polytopes, one in each line')
+    parser.add_argument('--box', type = int, default = 1, help = 'line number of the G-polytope')
+    parser.add_argument('--npoints', type = int, default = 100, help = 'number of points chosen in each sample')
+    parser.add_argument('--maxN', type = int, default = 10**7, help = 'maximal number of samples')
+    parser.add_argument('--target', type = float, default = 0.01, help = 'relative error to stop at, 0 to always do maxN samples')
+    parser.add_argument('--checkpoint', default = None, help = 'json file to save the state of the run and resume from')
+    parser.add_argument('--check-every', type = int, default = 10**4)
+    parser.add_argument('--gauge', action = 'store_true', help = 'compute the gauge groups of each good polytope')
+    parser.add_argument('--weight', action = 'store_true', help = 'compute the GL(3,Z) weight factor of each good polytope')
+    parser.add_argument('--pilot', type = int, default = 200, help = 'largest number of pilot samples for a choice of fixed vertices')
+    parser.add_argument('--max-fixed', type = int, default = 2)
+    parser.add_argument('--stats', default = None, help = 'json file for the statistics of aggregate.py')
+    parser.add_argument('--seed', type = int, default = None)
+    parser.add_argument('--out', default = None, help = 'output file, the output is printed if it is not given')
+    add_output_arguments(parser)
+    args = parser.parse_args(argv)
+    import random
+    from .fix_check import read_gpolytopes
+    from .run_control import run_box
+    from . import sink
+    random.seed(args.seed)
+    gpoly = read_gpolytopes(args.polytopes)[args.box - 1]
+    weight = None
+    if args.weight:
+        from .weight import box_weight
+        weight = box_weight(gpoly)
+    para = 'para:maxN=%d,npoints=%d,box=%d' % (args.maxN, args.npoints, args.box)
+    output = None
+    if args.out is None:
+        print(para)
+    else:
+        # a run resumed from the checkpoint continues the same output
+        import os
+        output = sink.open_sink(args.out, append = args.checkpoint is not None and os.path.exists(args.checkpoint), **output_options(args))
+        sink.write(output, para)
+    try:
+        run_box(gpoly, args.npoints, args.target, args.maxN, args.checkpoint, args.check_every, gauge = args.gauge, weight = weight,
+                pilot_n = args.pilot, max_fixed = args.max_fixed, stats_file = args.stats, output = output)
+    finally:
+        if output is not None:
+            sink.close(output)
+
+def mcmc_main(argv = None):
+    parser = argparse.ArgumentParser(prog = 'bp-mcmc', description = 'Markov chain Monte Carlo of random polytopes in the box dual to a G-polytope')
+    parser.add_argument('--polytopes', default = '3d-G-polytopes.txt', help = 'list of G-polytopes, one in each line')
+    parser.add_argument('--box', type = int, default = 1, help = 'line number of the G-polytope')
+    parser.add_argument('--npoints', type = int, default = 100, help = 'number of points chosen in each sample')
+    parser.add_argument('--samples', type = int, default = 10**4, help = 'number of samples, one every --thin steps')
+    parser.add_argument('--thin', type = int, default = None, help = 'number of steps between samples, npoints by default')
+    parser.add_argument('--pilot', type = int, default = 200, help = 'largest number of pilot samples for a choice of fixed vertices')
+    parser.add_argument('--max-fixed', type = int, default = 2)
+    parser.add_argument('--compare', action = 'store_true', help = 'compare the effective samples per second with the independent sampler, with --samples independent samples')
+    parser.add_argument('--steps', type = int, default = None, help = 'number of steps of each chain for --compare, --samples times the largest thin by default')
+    parser.add_argument('--seed', type = int, default = None)
+    parser.add_argument('--out', default = None, help = 'output file, the output is printed if it is not given')
+    add_output_arguments(parser)
+    args = parser.parse_args(argv)
+    import random
+    from .fix_check import read_gpolytopes
+    from .mcmc import run_mcmc, compare_samplers
+    from . import sink
+    random.seed(args.seed)
+    gpoly = read_gpolytopes(args.polytopes)[args.box - 1]
+    if args.compare:
+        thins = (1, 10, args.npoints) if args.thin is None else (args.thin,)
+        steps = args.samples * max(thins) if args.steps is None else args.steps
+        for name, est in compare_samplers(gpoly, args.npoints, args.samples, steps, thins).items():
+            print('%s: %s' % (name, est))
+        return
+    output = None if args.out is None else sink.open_sink(args.out, **output_options(args))
+    try:
+        run_mcmc(gpoly, args.npoints, args.samples, args.thin, args.pilot, args.max_fixed, output)
+    finally:
+        if output is not None:
+            sink.close(output)
+
+def montecarlo2d_main(argv = None):
+    parser = argparse.ArgumentParser(prog = 'bp-montecarlo-2d', description = 'Monte Carlo of random polygons in the k-dual of a minimal 2d base')
+    parser.add_argument('--m', type = int, default = 0, help = 'minimal base, 0-12 for F_m and 13 for P2')
+    parser.add_argument('--k', type = int, default = 6)
+    parser.add_argument('--box', default = None, help = 'vertices of another box like {{-10,10},{10,10},{10,-10},{-10,-10}}, whose polygons are checked with checkn_2d')
+    parser.add_argument('--npoints', type = int, default = 10, help = 'number of points chosen in each sample')
+    parser.add_argument('--totN', type = int, default = 10**5, help = 'number of samples')
+    parser.add_argument('--gauge', action = 'store_true', help = 'compute the gauge groups of each good polygon')
+    parser.add_argument('--redundancy', action = 'store_true', help = 'divide the weights by the number of GL(2,Z) images of each polygon in the box')
+    parser.add_argument('--workers', type = int, default = multiprocessing.cpu_count())
+    parser.add_argument('--seed', type = int, default = None)
+    parser.add_argument('--stats', default = None, help = 'json file for the statistics of aggregate.py')
+    args = parser.parse_args(argv)
+    from .polygon import minimal_base, box_rays, polygon_rays, run, estimate_counts
+    from .aggregate import save, summary
+    if args.box is None:
+        points, canonical, box = box_rays(minimal_base(args.m), args.k), True, 'k%d-m%d' % (args.k, args.m)
+    else:
+        from .fix_check import parse_polytope
+        points, canonical, box = polygon_rays(parse_polytope(args.box)), False, args.box
+    print('para:totN=%d,npoints=%d,box=%s,rays=%d' % (args.totN, args.npoints, box, len(points)))
+    stats = run(points, args.npoints, args.totN, k = args.k, canonical = canonical, gauge = args.gauge, seed = args.seed, box = box, workers = args.workers, redundancy = args.redundancy)
+    if args.stats is not None:
+        save(stats, args.stats)
+    print(summary(stats))
+    print('estimated number of polygons%s for each number of rays:' % (' up to GL(2,Z)' if args.redundancy else ''), estimate_counts(stats, box))
+
+def minimal_main(argv = None):
+    parser = argparse.ArgumentParser(prog = 'bp-minimal', description = 'Search of minimal G-polytopes with 4 or 5 vertices')
+    parser.add_argument('v123', help = 'list of choices of the first three vertices, one in each line')
+    parser.add_argument('out', help = 'output file')
+    parser.add_argument('--start', type = int, default = 1, help = 'first line of the list to use')
+    parser.add_argument('--end', type = int, default = None, help = 'last line of the list to use, the last line of the file by default')
+    parser.add_argument('--vertices', type = int, choices = [4, 5], default = 4)
+    parser.add_argument('--primary-bound', type = int, default = None, help = '10 for 4 vertices, 4 for 5 vertices by default')
+    parser.add_argument('--final-bound', type = int, default = None, help = '50 for 4 vertices, 10 for 5 vertices by default')
+    parser.add_argument('--step-size', type = int, default = None, help = '6 for 4 vertices, 2 for 5 vertices by default')
+    add_output_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.end is None:
+        with open(args.v123, 'r') as file:
+            args.end = len(file.readlines())
+    if args.vertices == 4:
+        from .minimal import search_file
+        defaults = (10, 50, 6)
+    else:
+        from .minimal_v5 import search_file_v5 as search_file
+        defaults = (4, 10, 2)
+    bounds = [given if given is not None else default for given, default in zip((args.primary_bound, args.final_bound, args.step_size), defaults)]
+    search_file(args.v123, args.out, args.start, args.end, *bounds, **output_options(args))
+
+def dedup_main(argv = None):
+    parser = argparse.ArgumentParser(prog = 'bp-dedup', description = 'Remove the permutational redundancy of a list of polytopes')
+    parser.add_argument('input', help = 'list of polytopes, one in each line like {{1,0,0},{0,1,0},{0,0,1},{-1,-1,-1}}')
+    parser.add_argument('output')
+    parser.add_argument('--n', type = int, default = 4, help = 'number of vertices of the polytopes')
+    args = parser.parse_args(argv)
+    from .permutational_vn import check_perm, generate_permutations
+    check_perm(args.input, args.output, generate_permutations(args.n), args.n)
+
+def gauge_main(argv = None):
+    parser = argparse.ArgumentParser(prog = 'bp-gauge', description = 'h11 and gauge groups of polytopes')
+    parser.add_argument('polytopes', nargs = '*', help = 'polytopes like {{1,0,0},{0,1,0},{0,0,1},{-1,-1,-1}}')
+    parser.add_argument('--file', default = None, help = 'file with one polytope in each line')
+    args = parser.parse_args(argv)
+    from .fix_check import parse_polytope, read_gpolytopes, toString
+    from .new_gauge import gen_rays, determine_gauge
+    vlists = [parse_polytope(p) for p in args.polytopes]
+    if args.file is not None:
+        vlists += read_gpolytopes(args.file)
+    for vlist in vlists:
+        print('%s h11=%d %s' % (toString(vlist), len(gen_rays(vlist)) - 3, determine_gauge(vlist)))
+
+def scheduler_main(argv = None):
+    parser = argparse.ArgumentParser(prog = 'bp-scheduler', description = 'Work queue for the Monte Carlo of all G-boxes')
+    parser.add_argument('command', choices = ['init', 'work', 'local', 'status'])
+    parser.add_argument('--db', default = 'queue.db', help = 'queue database, on a shared filesystem for several machines')
+    parser.add_argument('--polytopes', default = '3d-G-polytopes.txt')
+    parser.add_argument('--boxes', default = None, help = 'line numbers of the boxes, e.g. 1-100,205')
+    parser.add_argument('--out', default = 'output')
+    parser.add_argument('--workers', type = int, default = multiprocessing.cpu_count())
+    parser.add_argument('--lease', type = float, default = 3600, help = 'seconds before a unit of a dead worker is retried')
+    parser.add_argument('--attempts', type = int, default = 3)
+    parser.add_argument('--npoints', type = int, default = 100)
+    parser.add_argument('--target', type = float, default = 0.01)
+    parser.add_argument('--maxN', type = int, default = 10**7)
+    parser.add_argument('--gauge', action = 'store_true')
+    parser.add_argument('--weight', action = 'store_true', help = 'compute the GL(3,Z) weight factor of each good polytope')
+    add_output_arguments(parser)
+    args = parser.parse_args(argv)
+    from .scheduler import init_queue, work, run_local, status, parse_boxes
+    if args.command == 'init':
+        config = {'npoints': args.npoints, 'target': args.target, 'maxN': args.maxN, 'gauge': args.gauge, 'weight': args.weight, 'output': output_options(args)}
+        init_queue(args.db, args.polytopes, config, parse_boxes(args.boxes))
+    elif args.command == 'work':
+        work(args.db, args.out, lease_time = args.lease, max_attempts = args.attempts)
+    elif args.command == 'local':
+        run_local(args.db, args.out, args.workers, args.lease, args.attempts)
+    print(status(args.db))
+
+def aggregate_main(argv = None):
+    parser = argparse.ArgumentParser(prog = 'bp-aggregate', description = 'Merge the statistics of Monte Carlo runs')
+    parser.add_argument('files', nargs = '+', help = 'statistics files (*.json) or outputs of the runs')
+    args = parser.parse_args(argv)
+    from .aggregate import new_stats, merge, load, read_output, summary, distribution
+    stats = new_stats()
+    for filename in args.files:
+        if filename.endswith('.json'):
+            stats = merge(stats, load(filename))
+        else:
+            stats = read_output(filename, stats = stats)
+    print(summary(stats))
+    print(distribution(stats))
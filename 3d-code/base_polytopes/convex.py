@@ -1,7 +1,7 @@
 import numpy as np
-from scipy.spatial import ConvexHull
 from itertools import product
 from math import gcd
+from . import kernels
 
 def prime(v):
     return gcd(v[0], v[1], v[2]) == 1
@@ -20,14 +20,17 @@ def get_integer_points_in_convex_hull(hull):
     y_range = range(min_bound[1], max_bound[1] + 1)
     z_range = range(min_bound[2], max_bound[2] + 1)
 
-    integer_points = []
-    for point in product(x_range, y_range, z_range):
-        if prime(point) and is_point_in_convex_hull(point, hull):
-            integer_points.append(point)
+    integer_points = kernels.integer_points_in_hull(hull.equations, min_bound, max_bound)
+    if integer_points is None:
+        integer_points = []
+        for point in product(x_range, y_range, z_range):
+            if prime(point) and is_point_in_convex_hull(point, hull):
+                integer_points.append(point)
 
     return np.array(integer_points)
 
 if __name__ == '__main__':
+    from scipy.spatial import ConvexHull
     v1 = np.array([1,0,0], dtype = object)
     v2 = np.array([0,1,0], dtype = object)
     v3 = np.array([0,0,1], dtype = object)
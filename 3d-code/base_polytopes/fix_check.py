@@ -0,0 +1,142 @@
+import numpy as np
+import math
+import random
+from itertools import combinations
+from .check import checkn
+from .new_gauge import gen_rays
+from .lattice_hull import lattice_hull
+from . import sink
+
+def reduce(x):
+    if abs(x - math.floor(x)) < 10**(-10):
+        return math.floor(x)
+    elif abs(x - math.ceil(x)) < 10**(-10):
+        return math.ceil(x)
+    return x
+
+#Randomly choose a point in the polytope
+def gen_point(primative_rays):
+    p_range = len(primative_rays) - 1
+    i = random.randint(0, p_range)
+    return primative_rays[i]
+
+#Read a polytope in the form {{1,0,0},{0,1,0},{0,0,1},{-1,-1,-1}}
+def parse_polytope(line):
+    line = line.strip().replace(' ', '')
+    vlist = []
+    for v_str in line[2:-2].split('},{'):
+        vlist.append(np.array([int(x) for x in v_str.split(',')], dtype = object))
+    return vlist
+
+#Read the G-polytopes, one polytope in each line
+def read_gpolytopes(filename):
+    gpolys = []
+    with open(filename, 'r') as file:
+        for line in file:
+            if line.strip():
+                gpolys.append(parse_polytope(line))
+    return gpolys
+
+def toString(vlist):
+    return ''.join('(' + str(int(v[0])) + ',' + str(int(v[1])) + ','+str(int(v[2])) + ')' for v in vlist)
+
+#Candidates for the fixed vertices: for each vertex of the box, the closest primitive ray in the box
+def fixed_candidates(gpoly, primative_rays):
+    box, facets = lattice_hull(gpoly, 6)
+    candidates = []
+    for b in box:
+        b = np.array(b, dtype = float)
+        i = int(np.argmin(((np.array(primative_rays, dtype = float) - b) ** 2).sum(axis = 1)))
+        v = np.array([int(x) for x in primative_rays[i]], dtype = object)
+        if not any(all(v == c) for c in candidates):
+            candidates.append(v)
+    return candidates
+
+#Randomly choose npoints points with the fixed vertices, and keep the vertices of their convex hull
+def gen_vlist(primative_rays, fixed_vlist, npoints):
+    from scipy.spatial import ConvexHull
+    raw_vlist = list(fixed_vlist)
+    for i in range(npoints - len(fixed_vlist)):
+        v = gen_point(primative_rays)
+        raw_vlist.append(v)
+    hull = ConvexHull(raw_vlist)
+    indexlist = hull.vertices
+    return [raw_vlist[i] for i in indexlist]
+
+#Distance of the origin to the boundary of the hull of vlist, negative when the origin is outside
+def origin_depth(vlist):
+    from scipy.spatial import ConvexHull
+    return float(-ConvexHull(np.array(vlist, dtype = float)).equations[:, 3].max())
+
+#Choose the best set of at most max_fixed fixed vertices by successive halving: each round adds pilot_n // 8 samples
+#(at least 10) to every remaining set and keeps the better half, until one set is left or the sets have pilot_n samples
+#Sets are compared by acceptance of checkn, and with the same acceptance (e.g. 0 in a box with a low acceptance) by the
+#mean depth of the origin in the hull, since the polytopes in the box always pass the checks of the dual
+#Returns the set, its acceptance and the acceptance of every set when it was dropped
+def choose_fixed(primative_rays, candidates, npoints, pilot_n, max_fixed):
+    sets = [list(f) for m in range(min(max_fixed, npoints - 1, len(candidates)) + 1) for f in combinations(candidates, m)]
+    batch = max(pilot_n // 8, 10)
+    # samples, good samples, and sum and number of the depths of each set, flat samples have no depth
+    counts = [[0, 0, 0.0, 0] for _ in sets]
+    pilot = {}
+    alive = list(range(len(sets)))
+    while True:
+        for i in alive:
+            for times in range(batch):
+                counts[i][0] += 1
+                try:
+                    vlist = gen_vlist(primative_rays, sets[i], npoints)
+                except Exception:
+                    continue
+                counts[i][1] += checkn(vlist)
+                counts[i][2] += origin_depth(vlist)
+                counts[i][3] += 1
+            pilot[toString(sets[i])] = counts[i][1] / counts[i][0]
+        # the sort is stable, exact ties keep the order of the sets, which starts with fewer fixed vertices
+        alive.sort(key = lambda i: (counts[i][1] / counts[i][0], counts[i][2] / max(counts[i][3], 1)), reverse = True)
+        if len(alive) == 1 or counts[alive[0]][0] >= pilot_n:
+            break
+        alive = alive[:(len(alive) + 1) // 2]
+    best = alive[0]
+    return sets[best], counts[best][1] / counts[best][0], pilot
+
+#Compute the primitive rays in the polytope in advance to increase the efficiency
+#The fixed vertices are chosen automatically by a pilot run of at most pilot_n samples for each candidate set
+#The output lines go to output, a sink of sink.py, if it is given, and are printed otherwise
+def run(totN: int, npoints: int, gpoly, pilot_n = 200, max_fixed = 2, rays_file = None, output = None):
+    if npoints <= 3:
+        print('Number of points should be greater than 3!')
+        return 0
+    out = print if output is None else lambda line: sink.write(output, line)
+    if rays_file is None:
+        primative_rays = gen_rays(lattice_hull(gpoly, 6)[0])
+    else:
+        primative_rays = np.loadtxt(rays_file)
+    candidates = fixed_candidates(gpoly, primative_rays)
+    fixed_vlist, rate, pilot = choose_fixed(primative_rays, candidates, npoints, pilot_n, max_fixed)
+    metadata = {'box': toString(gpoly), 'rays': len(primative_rays), 'fixed': toString(fixed_vlist), 'pilot_n': pilot_n, 'acceptance': rate, 'pilot': pilot}
+    out('metadata:%s' % metadata)
+    goodn = 0
+    for times in range(totN):
+        try:
+            vlist = gen_vlist(primative_rays, fixed_vlist, npoints)
+        except Exception:
+            # flat samples are rejected, as in choose_fixed
+            continue
+        if checkn(vlist):
+            rays = gen_rays(vlist)
+            out('%d: %s %d h11=%d' % (times + 1, toString(vlist), len(vlist), len(rays) - 3))
+            goodn += 1
+    out(str(goodn))
+    return goodn
+
+if __name__ == '__main__':
+    print('----------fix check.py----------')
+    #test codes
+    totN, npoints = 10**7, 100
+    #the box is given by its line number in 3d-G-polytopes.txt
+    box_id = 1
+    gpoly = read_gpolytopes('3d-G-polytopes.txt')[box_id - 1]
+    print('para:totN=%d,npoints=%d,box=%d' % (totN, npoints, box_id))
+    run(totN, npoints, gpoly)
+    print('----------fix check.py end----------')
@@ -0,0 +1,151 @@
+import os
+import warnings
+import numpy as np
+
+#Backend of the inner loops of solve3.solve, basic.insiden/interiorn, new_gauge.count_gauge and convex.get_integer_points_in_convex_hull
+#'python' runs the original python code, 'numba' runs the compiled loops of kernels_numba.py, which give identical results
+#The backend is chosen by set_backend or by the environment variable BP_KERNELS (python, numba or auto), auto by default:
+#numba if it can be imported, and python otherwise
+#Each function below returns None when the python code should be used: python backend, or input which does not fit in int64/float64
+backend = None
+compiled = None
+
+def set_backend(name):
+    global backend, compiled
+    if name not in ['python', 'numba', 'auto']:
+        raise ValueError('Unknown backend %s, should be python, numba or auto' % name)
+    if name == 'python':
+        backend = 'python'
+        return backend
+    try:
+        from . import kernels_numba
+        compiled = kernels_numba
+        backend = 'numba'
+    except ImportError:
+        if name == 'numba':
+            warnings.warn('numba can not be imported, the python backend is used')
+        backend = 'python'
+    return backend
+
+def get_backend():
+    if backend is None:
+        set_backend(os.environ.get('BP_KERNELS', 'auto'))
+    return backend
+
+#Integer matrix of python integers for the int64 kernels, None if there are floats or too large integers
+def integer_matrix(rows):
+    if not all(isinstance(x, (int, np.integer)) for row in rows for x in row):
+        return None
+    try:
+        return np.array([[int(x) for x in row] for row in rows], dtype = np.int64)
+    except OverflowError:
+        return None
+
+#solve3.solve
+def solve(ineqs, n):
+    if get_backend() != 'numba' or len(ineqs) == 0:
+        return None
+    A = integer_matrix(ineqs)
+    if A is None:
+        return None
+    solutions, status = compiled.solve(A, n)
+    if status:
+        return None
+    return [np.array(s, dtype = object) for s in solutions.tolist()]
+
+#basic.insiden (strict = False) and basic.interiorn (strict = True)
+#Float vertices are computed in float64 as in python, integer vertices only when all coordinates are below 2**15 so that float64 is exact
+def inside(vertices, facets, point, strict):
+    if get_backend() != 'numba' or len(facets) == 0:
+        return None
+    A = integer_matrix(list(vertices) + [point])
+    if A is not None:
+        if np.abs(A).max() > 2 ** 15:
+            return None
+        V, P = A[:-1].astype(np.float64), A[-1].astype(np.float64)
+    else:
+        if not all(isinstance(x, (float, np.floating)) for v in vertices for x in v):
+            return None
+        V, P = np.array([[float(x) for x in v] for v in vertices]), np.array([float(x) for x in point])
+    result, status = compiled.inside(V, np.array(facets, dtype = np.int64), P, strict)
+    if status:
+        return None
+    return result
+
+#new_gauge.order of each ray, a list of (order, vertices where it is reached)
+def orders(rays, vertices, offset):
+    if get_backend() != 'numba' or len(rays) == 0 or len(vertices) == 0:
+        return None
+    R, V = integer_matrix(rays), integer_matrix(vertices)
+    if R is None:
+        return None
+    if V is None:
+        V = np.array([[x for x in v] for v in vertices])
+        if V.dtype.kind != 'f' or np.abs(R).max() > 2 ** 53:
+            return None
+        R = R.astype(np.float64)
+    elif np.abs(R).max() * np.abs(V).max() * V.shape[1] + abs(offset) > 2 ** 62:
+        return None
+    values, reached = compiled.orders(R, V, offset)
+    return [(value, [vertices[i] for i in np.nonzero(row)[0]]) for value, row in zip(values.tolist(), reached)]
+
+#The loop of convex.get_integer_points_in_convex_hull
+def integer_points_in_hull(equations, lower, upper):
+    if get_backend() != 'numba':
+        return None
+    return compiled.integer_points_in_hull(np.asarray(equations, dtype = np.float64), np.asarray(lower, dtype = np.int64), np.asarray(upper, dtype = np.int64))
+
+if __name__ == '__main__':
+    import random
+    import time
+    from scipy.spatial import ConvexHull
+    from .fix_check import read_gpolytopes, gen_vlist
+    from .lattice_hull import lattice_hull
+    from .new_gauge import gen_rays, gen_inside_points, determine_gauge
+    from .check import checkn
+    from .basic import insiden, interiorn
+    from .convex import get_integer_points_in_convex_hull
+    from .polygon import box_rays, minimal_base, determine_gauge_2d
+    #the backend is set in the module used by the other modules, not in __main__
+    from . import kernels
+    print('----------test kernels.py----------')
+    #differential test: each function is run with both backends on the same polytopes, and the results should be identical
+    if kernels.set_backend('numba') != 'numba':
+        print('numba is not installed, nothing to compare')
+    else:
+        kernels.set_backend('python')
+        gpolys = read_gpolytopes(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '3d', '3d-G-polytopes.txt'))
+        random.seed(1)
+        cases = []
+        for box in [1, 2000, 4553]:
+            box_points = gen_rays(lattice_hull(gpolys[box - 1], 6)[0])
+            cases += [gen_vlist(box_points, [], 20) for _ in range(20)]
+        good = [vlist for vlist in cases if checkn(vlist)]
+        def hull_tests(vlist):
+            hull = ConvexHull(vlist)
+            points = [np.array([random.randint(-50, 50) for _ in range(3)]) for _ in range(20)] + list(vlist)
+            return [insiden(hull.points, hull.simplices, p) for p in points] + [interiorn(hull.points, hull.simplices, p) for p in points]
+        polygons = [[tuple(p) for p in random.sample(box_rays(minimal_base(m), 6).tolist(), 10)] for m in [0, 2, 13] for _ in range(10)]
+        tests = [('box rays (solve)', lambda g: [tuple(r) for r in gen_rays(lattice_hull(g, 6)[0])], gpolys[:3] + gpolys[-3:]),
+                 ('gen_rays (solve)', lambda v: [tuple(r) for r in gen_rays(v)], cases),
+                 ('gen_inside_points (solve)', lambda v: [tuple(r) for r in gen_inside_points(v)], good),
+                 ('checkn (interiorn)', checkn, cases),
+                 ('insiden, interiorn', lambda v: (random.seed(len(v)), hull_tests(v))[1], cases),
+                 ('determine_gauge (order)', determine_gauge, good),
+                 ('determine_gauge_2d (order)', determine_gauge_2d, polygons),
+                 ('get_integer_points_in_convex_hull', lambda v: get_integer_points_in_convex_hull(ConvexHull(np.array(v, dtype = float))).tolist(), cases[:20] + cases[-20:])]
+        def safe(f, x):
+            try:
+                return f(x)
+            except Exception as e:
+                return type(e).__name__
+        for name, f, inputs in tests:
+            results, times = {}, {}
+            for b in ['python', 'numba']:
+                kernels.set_backend(b)
+                safe(f, inputs[0])
+                start = time.time()
+                results[b] = [safe(f, x) for x in inputs]
+                times[b] = time.time() - start
+            print('%s: %d inputs, identical %s, python %.3fs, numba %.3fs' % (name, len(inputs), results['python'] == results['numba'], times['python'], times['numba']))
+    print('----------test kernels.py end----------')
@@ -0,0 +1,192 @@
+import numpy as np
+from numba import njit
+
+#Compiled versions of the loops of solve3, basic, new_gauge and convex, see kernels.py
+#They do the same operations in the same order, on int64 where the python code uses integers and on float64 where it uses floats
+#A kernel returns a status, 0 if the result is valid and 1 if the python code should be used instead (overflow or an error to raise)
+
+#Integers up to 2**53 are exact in float64, so divisions give the same float as python
+LIMIT = 2 ** 53
+
+@njit(cache = True)
+def reduce(x):
+    if abs(x - np.ceil(x)) < 10 ** (-10):
+        return np.ceil(x)
+    elif abs(x - np.floor(x)) < 10 ** (-10):
+        return np.floor(x)
+    return x
+
+@njit(cache = True)
+def gcd(a, b):
+    a, b = abs(a), abs(b)
+    while b:
+        a, b = b, a % b
+    return a
+
+@njit(cache = True)
+def cross(a, b):
+    return np.array([a[1] * b[2] - a[2] * b[1], a[2] * b[0] - a[0] * b[2], a[0] * b[1] - a[1] * b[0]])
+
+@njit(cache = True)
+def sign(x):
+    if abs(x) <= 10 ** (-7):
+        return 0
+    elif x > 0:
+        return 1
+    return -1
+
+@njit(cache = True)
+def dot(a, b):
+    s = a[0] * b[0]
+    for i in range(1, len(a)):
+        s = s + a[i] * b[i]
+    return s
+
+#Eliminate the last unknown n of the inequalities A[:, 0] + A[:, 1:] . x >= 0, as solve3.decompose
+#Each new inequality is divided by the gcd of its coefficients, which does not change the bounds computed from it
+@njit(cache = True)
+def decompose(A, n):
+    upper = np.nonzero(A[:, n] < 0)[0]
+    lower = np.nonzero(A[:, n] > 0)[0]
+    none = np.nonzero(A[:, n] == 0)[0]
+    B = np.empty((len(upper) * len(lower) + len(none), n), dtype = np.int64)
+    r = 0
+    for u in upper:
+        for l in lower:
+            g = 0
+            for c in range(n):
+                a, b = A[l, n], A[u, c]
+                e, f = A[u, n], A[l, c]
+                if (b != 0 and abs(a) > LIMIT // 2 // abs(b)) or (f != 0 and abs(e) > LIMIT // 2 // abs(f)):
+                    return B, 1
+                B[r, c] = a * b - e * f
+                g = gcd(g, B[r, c])
+            if g > 1:
+                for c in range(n):
+                    B[r, c] //= g
+            r += 1
+    for no in none:
+        B[r] = A[no, :n]
+        r += 1
+    return B, 0
+
+#Bounds of unknown n from the inequalities A with the first n - 1 unknowns given by solution, as solve3.substitute
+@njit(cache = True)
+def substitute(A, solution, n):
+    upperbound, lowerbound = np.inf, -np.inf
+    nu, nl = 0, 0
+    for i in range(A.shape[0]):
+        if A[i, n] == 0:
+            continue
+        s = 0
+        for c in range(n):
+            if solution[c] != 0 and abs(A[i, c]) > LIMIT // (n + 1) // abs(solution[c]):
+                return 0.0, 0.0, 1
+            s += solution[c] * A[i, c]
+        bound = -s / A[i, n]
+        if A[i, n] < 0:
+            upperbound = min(upperbound, bound)
+            nu += 1
+        else:
+            lowerbound = max(lowerbound, bound)
+            nl += 1
+    if nu == 0 or nl == 0:
+        return 0.0, 0.0, 1
+    return reduce(upperbound), reduce(lowerbound), 0
+
+#All integer solutions (1, x1, ..., xn) of the inequalities, in the order of solve3.solve
+@njit(cache = True)
+def solve(A, n):
+    for i in range(A.shape[0]):
+        for c in range(A.shape[1]):
+            if abs(A[i, c]) > LIMIT:
+                return np.empty((0, n + 1), dtype = np.int64), 1
+    levels = [A]
+    for j in range(n, 1, -1):
+        B, status = decompose(levels[-1], j)
+        if status:
+            return np.empty((0, n + 1), dtype = np.int64), 1
+        levels.append(B)
+    upperbound, lowerbound, status = substitute(levels[-1], np.ones(1, dtype = np.int64), 1)
+    if status:
+        return np.empty((0, n + 1), dtype = np.int64), 1
+    low, high = int(np.ceil(lowerbound)), int(np.floor(upperbound))
+    solutions = np.ones((max(high - low + 1, 0), 2), dtype = np.int64)
+    solutions[:, 1] = np.arange(low, high + 1)
+    for j in range(2, n + 1):
+        rows = levels[n - j]
+        lows = np.empty(len(solutions), dtype = np.int64)
+        counts = np.empty(len(solutions), dtype = np.int64)
+        for s in range(len(solutions)):
+            upperbound, lowerbound, status = substitute(rows, solutions[s], j)
+            if status:
+                return np.empty((0, n + 1), dtype = np.int64), 1
+            lows[s] = int(np.ceil(lowerbound))
+            counts[s] = max(int(np.floor(upperbound)) - lows[s] + 1, 0)
+        new_solutions = np.empty((counts.sum(), j + 1), dtype = np.int64)
+        r = 0
+        for s in range(len(solutions)):
+            for i in range(counts[s]):
+                new_solutions[r, :j] = solutions[s]
+                new_solutions[r, j] = lows[s] + i
+                r += 1
+        solutions = new_solutions
+    return solutions, 0
+
+#basic.insiden (strict = False) and basic.interiorn (strict = True) on float64 vertices
+@njit(cache = True)
+def inside(vertices, facets, point, strict):
+    for i in range(len(facets)):
+        v1, v2, v3 = vertices[facets[i, 0]], vertices[facets[i, 1]], vertices[facets[i, 2]]
+        norm = cross(v2 - v1, v3 - v1)
+        p = 999
+        for j in range(len(vertices)):
+            if j == facets[i, 0] or j == facets[i, 1] or j == facets[i, 2]:
+                continue
+            if abs(dot(norm, vertices[j] - v1)) >= 10 ** (-7):
+                p = j
+                break
+        if p == 999:
+            return False, 1
+        s4, sp = sign(dot(vertices[p] - v1, norm)), sign(dot(point - v1, norm))
+        if strict and s4 != sp:
+            return False, 0
+        if not strict and not (s4 == sp or sp * s4 == 0):
+            return False, 0
+    return True, 0
+
+#new_gauge.order for each ray: the minimum of <ray, u> + offset over the vertices u, and the vertices where it is reached
+@njit(cache = True)
+def orders(rays, vertices, offset):
+    values = np.empty(len(rays), dtype = vertices.dtype)
+    reached = np.zeros((len(rays), len(vertices)), dtype = np.bool_)
+    for r in range(len(rays)):
+        my_order = vertices[0, 0] * 0 + 10 ** 9
+        for i in range(len(vertices)):
+            cur = dot(rays[r], vertices[i]) + offset
+            if cur < my_order:
+                my_order = cur
+                reached[r, :] = False
+                reached[r, i] = True
+            elif cur == my_order:
+                reached[r, i] = True
+        values[r] = my_order
+    return values, reached
+
+#Primitive integer points of the box lower <= x <= upper inside the hull given by its equations, as convex.get_integer_points_in_convex_hull
+@njit(cache = True)
+def integer_points_in_hull(equations, lower, upper):
+    points = []
+    for x in range(lower[0], upper[0] + 1):
+        for y in range(lower[1], upper[1] + 1):
+            for z in range(lower[2], upper[2] + 1):
+                if gcd(gcd(x, y), z) != 1:
+                    continue
+                inside = True
+                for e in range(len(equations)):
+                    if equations[e, 0] * x + equations[e, 1] * y + equations[e, 2] * z + equations[e, 3] > 1e-12:
+                        inside = False
+                        break
+                if inside:
+                    points.append((x, y, z))
+    return points
@@ -0,0 +1,97 @@
+import numpy as np
+import math
+
+#Real bounding box of the dual polytope {u|<u,v> >= -offset, v in vlist}, in any dimension
+def dual_bounds(vlist, offset):
+    from scipy.spatial import HalfspaceIntersection
+    from scipy.spatial._qhull import QhullError
+    halfspaces = np.array([[-float(x) for x in v] + [-float(offset)] for v in vlist])
+    try:
+        points = HalfspaceIntersection(halfspaces, np.zeros(len(vlist[0]))).intersections
+    except QhullError:
+        raise ValueError('Dual polytope is unbounded')
+    if not np.all(np.isfinite(points)):
+        raise ValueError('Dual polytope is unbounded')
+    lower = [math.floor(x - 10 ** (-7)) for x in points.min(axis = 0)]
+    upper = [math.ceil(x + 10 ** (-7)) for x in points.max(axis = 0)]
+    return lower, upper
+
+#Vertices of the convex hull of 2d integer points, collinear points are dropped
+def hull_2d(points):
+    points = sorted(set(points))
+    if len(points) <= 2:
+        return points
+    def turn(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+    lower, upper = [], []
+    for p in points:
+        while len(lower) >= 2 and turn(lower[-2], lower[-1], p) <= 0:
+            lower.pop()
+        lower.append(p)
+    for p in reversed(points):
+        while len(upper) >= 2 and turn(upper[-2], upper[-1], p) <= 0:
+            upper.pop()
+        upper.append(p)
+    return lower[:-1] + upper[:-1]
+
+#Integer hull of one slice u[i] = s, swept along u[j], columns along u[k]
+def slice_hull(A, offset, s, i, j, k, lower, upper):
+    t = np.arange(lower[j], upper[j] + 1, dtype = np.int64)
+    rhs = -offset - A[:, i][:, None] * s - A[:, j][:, None] * t[None, :]
+    coef = A[:, k]
+    lo = np.full(len(t), lower[k], dtype = np.int64)
+    hi = np.full(len(t), upper[k], dtype = np.int64)
+    pos, neg, zero = coef > 0, coef < 0, coef == 0
+    if pos.any():
+        lo = np.maximum(lo, (-((-rhs[pos]) // coef[pos][:, None])).max(axis = 0))
+    if neg.any():
+        hi = np.minimum(hi, (rhs[neg] // coef[neg][:, None]).min(axis = 0))
+    valid = lo <= hi
+    if zero.any():
+        valid &= (rhs[zero] <= 0).all(axis = 0)
+    columns = [(int(t[c]), int(lo[c]), int(hi[c])) for c in np.nonzero(valid)[0]]
+    points = [(tc, l) for tc, l, h in columns] + [(tc, h) for tc, l, h in columns]
+    return hull_2d(points)
+
+#Candidate vertices of the integer hull of the dual polytope, offset = 4 for F-polytope, =6 for G-polytope
+#Only the vertices of the 2d integer hull of each slice are kept, so the result spans the same hull as solve_lattice
+def lattice_hull_points(vlist, offset):
+    A = np.array([[int(v[0]), int(v[1]), int(v[2])] for v in vlist], dtype = np.int64)
+    lower, upper = dual_bounds(vlist, offset)
+    # slice along the shortest axis and sweep along the second shortest one
+    i, j, k = sorted(range(3), key = lambda axis: upper[axis] - lower[axis])
+    points = []
+    for s in range(lower[i], upper[i] + 1):
+        for t, w in slice_hull(A, offset, s, i, j, k, lower, upper):
+            p = [0, 0, 0]
+            p[i], p[j], p[k] = s, t, w
+            points.append(np.array(p, dtype = object))
+    return points
+
+#Vertices and facets of the integer hull of the dual polytope
+def lattice_hull(vlist, offset):
+    from scipy.spatial import ConvexHull
+    points = lattice_hull_points(vlist, offset)
+    hull = ConvexHull(points)
+    vertices = [points[_] for _ in hull.vertices]
+    skeleton_hull = ConvexHull(vertices)
+    return vertices, skeleton_hull.simplices
+
+if __name__ == '__main__':
+    print('----------test lattice_hull.py----------')
+    #test codes
+    from scipy.spatial import ConvexHull
+    from .solve3 import solve_lattice
+    v1 = np.array([1, 0, 0], dtype = object)
+    v2 = np.array([0, 1, 0], dtype = object)
+    v3 = np.array([0, 0, 1], dtype = object)
+    v4 = np.array([-1, -84, -516], dtype = object)
+    vlist = [v1, v2, v3, v4]
+    for offset in [4, 6]:
+        solutions = solve_lattice(vlist, offset)
+        hull = ConvexHull(solutions)
+        expected = sorted(tuple(int(x) for x in hull.points[_]) for _ in hull.vertices)
+        vertices, facets = lattice_hull(vlist, offset)
+        found = sorted(tuple(int(x) for x in v) for v in vertices)
+        print((offset, len(solutions), len(lattice_hull_points(vlist, offset)), expected == found))
+    print('----------test lattice_hull.py end----------')
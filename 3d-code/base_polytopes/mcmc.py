@@ -0,0 +1,281 @@
+import math
+import random
+import time
+import numpy as np
+from .check import checkn
+from .new_gauge import gen_rays
+from .lattice_hull import lattice_hull
+from .fix_check import toString, fixed_candidates, gen_vlist, choose_fixed
+from . import sink
+
+#Markov chain Monte Carlo in a given box, with the same distribution as fix_check.run: the state is the list of the npoints
+#chosen rays (the fixed vertices and npoints - len(fixed) rays chosen uniformly), and each step replaces one chosen ray
+#by a uniformly chosen ray. Adding and removing a ray would change npoints, so for a fixed npoints they are one replace move.
+#The proposal is symmetric and the target is uniform, so every move is accepted, and a chain started from an
+#independent sample is already in equilibrium
+#checkn and h11 are updated incrementally instead of being computed again for each polytope:
+#- the dual of the polytope is {u | <u,v> >= -6 for the chosen rays v}, and each move updates the number of these
+#  inequalities violated by vertices of the G-polytope, for the added and the removed ray only. When there are none the
+#  dual contains the G-polytope, so the dual checks of checkn pass, and checkn is whether the origin is inside the hull
+#- a move only marks the hull as changed, when the new ray is outside it or the removed ray was the last copy of a
+#  vertex. When the polytope is observed the hull of the chosen rays is computed, and h11 + 3, the number of rays of the
+#  box in the hull, is updated by the rays gained and lost between the old and the new hull. These rays are in the
+#  bounding box of the facets which are not in both hulls. While the origin is outside the hull the number is not
+#  needed, so it is dropped and counted again at the next good polytope
+
+#Chain with the rays of the box as an int64 array sorted by the first coordinate, the chosen rays as indices and the
+#number of copies of each index, for the G-polytope gpoly
+def new_chain(primative_rays, fixed_vlist, npoints, gpoly, cache = None):
+    order = sorted(range(len(primative_rays)), key = lambda i: int(primative_rays[i][0]))
+    objects = [primative_rays[i] for i in order]
+    rays = np.array([[int(x) for x in r] for r in objects], dtype = np.int64)
+    index = {tuple(r): i for i, r in enumerate(rays.tolist())}
+    fixed = [index[tuple(int(x) for x in v)] for v in fixed_vlist]
+    chosen = [random.randint(0, len(rays) - 1) for _ in range(npoints - len(fixed))]
+    g = np.array([[int(x) for x in v] for v in gpoly], dtype = np.int64)
+    points = rays.astype(float)
+    chain = {'rays': rays, 'points': points, 'columns': [points[:, j].copy() for j in range(3)], 'objects': objects,
+             'fixed': fixed, 'chosen': chosen, 'counts': {}, 'violated': ((rays @ g.T) < -6).sum(axis = 1), 'violations': 0,
+             'vertices': None, 'equations': None, 'simplices': None, 'dirty': False, 'nrays': None,
+             'cache': {} if cache is None else cache, 'steps': 0, 'rebuilds': 0, 'recounts': 0, 'checks': 0}
+    for i in fixed + chosen:
+        if i not in chain['counts']:
+            chain['violations'] += int(chain['violated'][i])
+        chain['counts'][i] = chain['counts'].get(i, 0) + 1
+    rebuild(chain, list(chain['counts']))
+    if origin_inside(chain):
+        recount(chain)
+    return chain
+
+#Hull of the given ray indices, with the ray indices of the vertices of its facets, the vertices are None if they are coplanar
+def rebuild(chain, indices):
+    from scipy.spatial import ConvexHull
+    indices = np.array(indices)
+    try:
+        hull = ConvexHull(chain['points'][indices])
+    except Exception:
+        chain['vertices'], chain['equations'], chain['simplices'] = None, None, None
+        return
+    chain['vertices'] = frozenset(indices[hull.vertices].tolist())
+    chain['equations'] = hull.equations
+    chain['simplices'] = indices[hull.simplices]
+
+#Points with integer coordinates are at least 1/|normal| from a facet they are not on, so the tolerance is safe
+def inside(chain, i):
+    return bool((chain['equations'][:, :3] @ chain['points'][i] + chain['equations'][:, 3] <= 10**(-9)).all())
+
+def origin_inside(chain):
+    return chain['vertices'] is not None and bool((chain['equations'][:, 3] < -10**(-9)).all())
+
+#Number of the rays of the given indices in the hull with the given equations
+def count_inside(chain, indices, equations):
+    return int((chain['points'][indices] @ equations[:, :3].T + equations[:, 3] <= 10**(-9)).all(axis = 1).sum())
+
+#Number of rays of the box in the hull, counted from scratch
+def recount(chain):
+    chain['recounts'] += 1
+    chain['nrays'] = count_inside(chain, slice(None), chain['equations'])
+
+#Indices of the rays in the box [low, high] (coordinates), the rays are sorted by their first coordinate
+def box_indices(chain, low, high):
+    x, y, z = chain['columns']
+    a, b = np.searchsorted(x, [low[0], high[0]])
+    y, z = y[a:b], z[a:b]
+    return a + np.flatnonzero((y >= low[1]) & (y <= high[1]) & (z >= low[2]) & (z <= high[2]))
+
+#Rays gained minus rays lost from the hull (equations, simplices) old to the current hull. Both hulls are the same
+#outside the region between their facets which are not in both, so the rays are looked for in the bounding box of these facets
+def difference(chain, old):
+    equations, simplices = old
+    facets = set(map(tuple, np.sort(simplices, axis = 1).tolist()))
+    new_facets = set(map(tuple, np.sort(chain['simplices'], axis = 1).tolist()))
+    changed = list(facets ^ new_facets)
+    if not changed:
+        return 0
+    corners = chain['points'][np.array(changed).ravel()]
+    near = box_indices(chain, corners.min(axis = 0) - 0.5, corners.max(axis = 0) + 0.5)
+    return count_inside(chain, near, chain['equations']) - count_inside(chain, near, equations)
+
+#Replace the chosen ray k by the ray new
+def replace(chain, k, new):
+    old = chain['chosen'][k]
+    chain['steps'] += 1
+    if old == new:
+        return
+    chain['chosen'][k] = new
+    counts = chain['counts']
+    counts[old] -= 1
+    if counts[old] == 0:
+        del counts[old]
+        chain['violations'] -= int(chain['violated'][old])
+        if chain['vertices'] is None or old in chain['vertices']:
+            chain['dirty'] = True
+    if new not in counts:
+        chain['violations'] += int(chain['violated'][new])
+        # once the hull changed, it is computed again at the next observation anyway, and a flat hull has no inside
+        if not chain['dirty'] and (chain['equations'] is None or not inside(chain, new)):
+            chain['dirty'] = True
+    counts[new] = counts.get(new, 0) + 1
+
+def step(chain):
+    replace(chain, random.randint(0, len(chain['chosen']) - 1), random.randint(0, len(chain['rays']) - 1))
+
+#Hull and number of rays in it after the moves since the last observation
+def update(chain):
+    if not chain['dirty']:
+        return
+    chain['dirty'] = False
+    chain['rebuilds'] += 1
+    old = (chain['equations'], chain['simplices'])
+    rebuild(chain, list(chain['counts']))
+    if not origin_inside(chain):
+        chain['nrays'] = None
+    elif chain['nrays'] is not None and old[0] is not None:
+        chain['nrays'] += difference(chain, old)
+
+#checkn and h11 of the current polytope, h11 = None if it is not good
+#checkn is only called (and cached for each set of vertices) when some vertex of the G-polytope is outside the dual
+def observe(chain):
+    update(chain)
+    vertices = chain['vertices']
+    if vertices is None:
+        return None
+    if chain['violations'] == 0:
+        good = origin_inside(chain)
+    else:
+        if vertices not in chain['cache']:
+            chain['checks'] += 1
+            chain['cache'][vertices] = checkn([chain['objects'][i] for i in sorted(vertices)])
+        good = chain['cache'][vertices]
+    if not good:
+        return None
+    if chain['nrays'] is None:
+        recount(chain)
+    return chain['nrays'] - 3
+
+#Integrated autocorrelation time with the automatic window of Sokal: the smallest window M with M >= c * tau(M)
+def autocorrelation_time(series, c = 5):
+    x = np.asarray(series, dtype = float)
+    n = len(x)
+    x = x - x.mean()
+    if n < 2 or not x.any():
+        return 1.0
+    f = np.fft.rfft(x, 2 * n)
+    acf = np.fft.irfft(f * np.conj(f))[:n]
+    taus = 2 * np.cumsum(acf / acf[0]) - 1
+    for m in range(1, n):
+        if m >= c * taus[m]:
+            return max(float(taus[m]), 1.0)
+    return max(float(taus[-1]), 1.0)
+
+#Acceptance and mean h11 of the good polytopes of a series of h11 (None if not good), with the autocorrelation times,
+#the effective sample sizes and the half width of the confidence intervals, z = 1.96 for 95%
+def series_estimates(h11s, z = 1.96):
+    good = np.array([h is not None for h in h11s], dtype = float)
+    n = len(good)
+    est = {'samples': n, 'good': int(good.sum())}
+    if n == 0:
+        return est
+    p = float(good.mean())
+    tau = autocorrelation_time(good)
+    est['acceptance'] = (p, z * math.sqrt(p * (1 - p) * tau / n))
+    est['tau_acceptance'], est['ess_acceptance'] = tau, n / tau
+    if est['good'] < 2:
+        return est
+    h = np.array([x if x is not None else 0 for x in h11s], dtype = float)
+    mean = float(h.sum() / good.sum())
+    # the ratio estimator sum(h) / sum(good) has the variance of h - mean * good, divided by p^2
+    y = h - mean * good
+    tau = autocorrelation_time(y)
+    est['h11'] = (mean, z * math.sqrt(y.var() * tau / n) / p)
+    est['tau_h11'], est['ess_h11'] = tau, n / tau
+    return est
+
+#Series of h11 of samples observations of the chain, one every thin steps, record(times, h11) is called for the good ones
+def chain_series(chain, samples, thin, record = None):
+    h11s = []
+    for times in range(1, samples + 1):
+        for _ in range(thin):
+            step(chain)
+        h11 = observe(chain)
+        h11s.append(h11)
+        if record is not None and h11 is not None:
+            record(times, h11)
+    return h11s
+
+#Estimates of a series with the time it took and the effective samples per second, and the work done by the chain
+def timed_estimates(h11s, seconds, chain = None):
+    est = series_estimates(h11s)
+    est['seconds'] = seconds
+    for key in ['acceptance', 'h11']:
+        if 'ess_' + key in est:
+            est['ess_per_second_' + key] = est['ess_' + key] / seconds
+    if chain is not None:
+        for key in ['steps', 'rebuilds', 'recounts', 'checks']:
+            est[key] = chain[key]
+    return est
+
+#Markov chain of samples * thin steps in a given box, with the fixed vertices chosen as in fix_check.run
+#Every thin steps the current polytope is a sample, and the good ones are written like the output of fix_check.run,
+#to output (a sink of sink.py) if it is given and printed otherwise
+def run_mcmc(gpoly, npoints, samples, thin = None, pilot_n = 200, max_fixed = 2, output = None):
+    if npoints <= 3:
+        print('Number of points should be greater than 3!')
+        return None
+    out = print if output is None else lambda line: sink.write(output, line)
+    if thin is None:
+        thin = npoints
+    primative_rays = gen_rays(lattice_hull(gpoly, 6)[0])
+    candidates = fixed_candidates(gpoly, primative_rays)
+    fixed_vlist, rate, pilot = choose_fixed(primative_rays, candidates, npoints, pilot_n, max_fixed)
+    metadata = {'box': toString(gpoly), 'rays': len(primative_rays), 'fixed': toString(fixed_vlist), 'pilot_n': pilot_n, 'acceptance': rate, 'pilot': pilot, 'thin': thin}
+    out('metadata:%s' % metadata)
+    start = time.time()
+    chain = new_chain(primative_rays, fixed_vlist, npoints, gpoly)
+    def record(times, h11):
+        vlist = [chain['objects'][i] for i in sorted(chain['vertices'])]
+        out('%d: %s %d h11=%d' % (times, toString(vlist), len(vlist), h11))
+    h11s = chain_series(chain, samples, thin, record)
+    est = timed_estimates(h11s, time.time() - start, chain)
+    out('estimates:%s' % est)
+    return est
+
+#Series of h11 of n independent samples as in fix_check.run
+def independent_series(primative_rays, fixed_vlist, npoints, n):
+    h11s = []
+    for _ in range(n):
+        try:
+            vlist = gen_vlist(primative_rays, fixed_vlist, npoints)
+        except Exception:
+            h11s.append(None)
+            continue
+        h11s.append(len(gen_rays(vlist)) - 3 if checkn(vlist) else None)
+    return h11s
+
+#Effective samples per second of the independent sampler with samples samples and of Markov chains of steps steps
+#observed every thin steps for each thin, with the same fixed vertices
+def compare_samplers(gpoly, npoints, samples, steps, thins = (1, 10, 100), fixed_vlist = ()):
+    primative_rays = gen_rays(lattice_hull(gpoly, 6)[0])
+    start = time.time()
+    h11s = independent_series(primative_rays, fixed_vlist, npoints, samples)
+    result = {'independent': timed_estimates(h11s, time.time() - start)}
+    for thin in thins:
+        start = time.time()
+        chain = new_chain(primative_rays, fixed_vlist, npoints, gpoly)
+        h11s = chain_series(chain, steps // thin, thin)
+        result['mcmc thin=%d' % thin] = timed_estimates(h11s, time.time() - start, chain)
+    return result
+
+if __name__ == '__main__':
+    import os
+    from .fix_check import read_gpolytopes
+    print('----------test mcmc.py----------')
+    #test codes
+    random.seed(0)
+    gpolys = read_gpolytopes(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '3d', '3d-G-polytopes.txt'))
+    for box, npoints in [(5, 100), (1, 100)]:
+        print('box %d, npoints %d' % (box, npoints))
+        for name, est in compare_samplers(gpolys[box - 1], npoints, 400, 40000).items():
+            print('  %s: acceptance %.4f +- %.4f, h11 %.1f +- %.1f, tau %.1f, ess/s %.1f, %.1fs'
+                  % (name, est['acceptance'][0], est['acceptance'][1], est['h11'][0], est['h11'][1], est['tau_h11'], est['ess_per_second_h11'], est['seconds']))
+    print('----------test mcmc.py end----------')
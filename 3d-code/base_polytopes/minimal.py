@@ -0,0 +1,193 @@
+import numpy as np
+from .check import checkn_non_primitive
+from . import convex
+from . import sink
+import copy
+from math import gcd
+from itertools import product
+
+def equal(v1, v2):
+    return v1[0] == v2[0] and v1[1] == v2[1] and v1[2] == v2[2]
+
+def toString(vlist):
+    string_list = []
+    for v in vlist:
+        string_list.append('{%d, %d, %d}' % (v[0], v[1], v[2]))
+    return '{' + ','.join(string_list) + '}'
+
+def StringToList(s):
+    s = s[:-2]
+    vlist_str = s.split(' ')
+    vlist = []
+    for temp in vlist_str:
+        v_str = temp[1: -1]
+        v1, v2, v3 = int(v_str.split(',')[0]), int(v_str.split(',')[1]), int(v_str.split(',')[2])
+        vlist.append(np.array([v1, v2, v3], dtype = object))
+    return vlist
+
+def good_dual_base(vlist):
+    return checkn_non_primitive(vlist)
+
+def has_smaller_box(vlist):
+    from scipy.spatial import ConvexHull
+    hull = ConvexHull(vlist)
+    points = convex.get_integer_points_in_convex_hull(hull)
+    for v in vlist:
+        #print(v)
+        new_point_list = np.array([x for x in points if not equal(v , x)], dtype=object)
+        #print(new_point_list)
+        if checkn_non_primitive(new_point_list):
+            return True
+    return False
+
+#Closed form of good_dual_base for the simplices fix_vlist + [w] for a whole block of fourth vertices w
+#The origin is in the interior of the simplex iff it is a combination of the vertices with coefficients mu of the same sign,
+#and mu are the 3x3 minors of the vertices, linear in w. The G-dual is then the simplex whose vertices u_j satisfy
+#<u_j, v> = -6 for the vertices v other than v_j, and the origin is in the interior of its integer hull iff its lattice points
+#positively span the space. This is decided in two cases with the small vectors n of the array neighbours:
+#the lattice points n of the G-dual (<n, v> >= -6) positively span the space, then it is good,
+#or max_j <n, u_j> < 1, then all the lattice points u of the G-dual have <n, u> <= 0 and it is not good
+#Returns 1 for good, 0 for not good and -1 when checkn_non_primitive has to decide
+neighbours = np.array([n for n in product(range(-2, 3), repeat = 3) if any(n)], dtype = np.int64)
+spanning_cache = {}
+
+#Whether the neighbours in mask positively span the space, that is the origin is in the interior of their hull
+def positive_spanning(mask):
+    if mask not in spanning_cache:
+        points = neighbours[np.frombuffer(mask, dtype = np.bool_)]
+        spans = False
+        if len(points) >= 4 and np.linalg.matrix_rank(points) == 3:
+            from scipy.spatial import ConvexHull
+            spans = bool((ConvexHull(points).equations[:, 3] < -10**(-9)).all())
+        spanning_cache[mask] = spans
+    return spanning_cache[mask]
+
+def simplex_good_dual_base(fix_vlist, w_list):
+    p0, p1, p2 = [np.array([int(x) for x in v], dtype = np.int64) for v in fix_vlist]
+    W = np.array([[int(x) for x in w] for w in w_list], dtype = np.int64).reshape(-1, 3)
+    d = int(np.dot(p0, np.cross(p1, p2)))
+    mu = np.column_stack([W @ np.cross(p1, p2), -(W @ np.cross(p0, p2)), W @ np.cross(p0, p1), np.full(len(W), -d)])
+    interior = (mu > 0).all(axis = 1) | (mu < 0).all(axis = 1)
+    good = np.where(interior, -1, 0)
+    W = W[interior]
+    if len(W) == 0:
+        return good
+    inside = ((neighbours @ np.array([p0, p1, p2]).T).min(axis = 1) >= -6) & (W @ neighbours.T >= -6)
+    # vertices of the G-dual, any three vertices of the simplex are independent since mu has no zero
+    V = np.concatenate([np.broadcast_to(np.array([p0, p1, p2]), (len(W), 3, 3)), W[:, None, :]], axis = 1).astype(float)
+    U = np.stack([np.linalg.solve(np.delete(V, j, axis = 1), np.full((len(W), 3, 1), -6.0))[:, :, 0] for j in range(4)], axis = 1)
+    separated = ((U @ neighbours.T).max(axis = 1) < 1 - 10**(-9)).any(axis = 1)
+    for i, k in enumerate(np.nonzero(interior)[0]):
+        if separated[i]:
+            good[k] = 0
+        elif positive_spanning(inside[i].tobytes()):
+            good[k] = 1
+    return good
+
+#good is the result of simplex_good_dual_base if it is already known
+def Is_minimal_box(vlist, good = None):
+    if good is None:
+        good = simplex_good_dual_base(vlist[:3], vlist[3:])[0] if len(vlist) == 4 else -1
+    if good == -1:
+        good = good_dual_base(vlist)
+    if not good:
+        return 'NG'
+    if has_smaller_box(vlist):
+        return 'NM'
+    return 'M'
+
+def primary_explore_3d(fix_vlist: list, bound, step_size):
+    out_info_dict = {'NG': 'Not a good G-polytope', 'NM': 'Has smaller polytope', 'M': '*******-------Minimal polytope-------*******'}
+    minimal_list = []
+    edge_list = []
+    # need to specify the first three vertices in advance
+    for a in range(bound):
+        print('a=%d' % a)
+        # good_dual_base of the whole block of fixed a at once, only the good ones are checked further
+        good = simplex_good_dual_base(fix_vlist, [(-a, -b, -c) for b in range(bound) for c in range(bound)]).reshape(bound, bound)
+        for b in range(bound):
+            for c in range(bound):
+                if good[b, c] == 0:
+                    continue
+                vlist = copy.deepcopy(fix_vlist)
+                v4 = np.array([-a, -b, -c], dtype = object)
+                vlist.append(v4)
+                check_minimal = Is_minimal_box(vlist, good[b, c])
+                if check_minimal == 'M':
+                    if (bound - a) <= step_size or (bound - b) <= step_size or (bound - c) <= step_size:
+                        edge_list.append(vlist)
+                    else:
+                        minimal_list.append(vlist)
+    return minimal_list, edge_list
+
+def gen_nearby_vlist_3d(step_size, vlist, upperbound):
+    v0, v1, v2 = vlist[0], vlist[1], vlist[2]
+    v3 = vlist[3]
+    a, b, c = -v3[0], -v3[1], -v3[2]
+    nearby_list = []
+    for da in range(min(step_size + 1, upperbound - a + 1)):
+        for db in range(min(step_size + 1, upperbound - b + 1)):
+            for dc in range(min(step_size + 1, upperbound - c + 1)):
+                nearby_list.append([v0, v1, v2, np.array([-(a + da), -(b + db), -(c + dc)], dtype = object)])
+    return nearby_list
+
+def id(vlist):
+    return '%d-%d-%d' % (-vlist[3][0], -vlist[3][1], -vlist[3][2])
+
+def near_explore_3d(beginning_list, step_size, upperbound):
+    #Try to find minimal box in nearby region
+    waiting_queue = beginning_list
+    visited = set()
+    for l in waiting_queue:
+        visited.add(id(l))
+    minimal_list = []
+    while waiting_queue:
+        vlist = waiting_queue.pop(0)
+        vid = id(vlist)
+        if Is_minimal_box(vlist) == 'M':
+            #print(vlist[3])
+            minimal_list.append(vlist)
+            new_nearby_list = gen_nearby_vlist_3d(step_size, vlist, upperbound)
+            for new_vlist in new_nearby_list:
+                #print(new_vlist)
+                nvid = id(new_vlist)
+                if nvid not in visited:
+                    waiting_queue.append(new_vlist)
+                    visited.add(nvid)
+    return minimal_list
+
+def auto_search(fix_vlist, primary_bound, final_bound, step_size):
+    minimal_primary, edge_list = primary_explore_3d(fix_vlist, primary_bound, step_size)
+    print('Primary completed')
+    minimal_near = near_explore_3d(edge_list, step_size, final_bound)
+    print('Full completed')
+    minimal_full = minimal_primary + minimal_near
+    return minimal_full
+
+#Search the minimal boxes for the lines start to end of the list of first three vertices
+#The output is written by a sink of sink.py, in the given format and optionally compressed and rotated
+def search_file(v123_file_name, out_filename, start, end, primary_bound = 10, final_bound = 50, step_size = 6, format = 'text', compress = False, rotate_bytes = None):
+    with open(v123_file_name, 'r') as v_file:
+        v123list_list_str = v_file.readlines()
+        v_file.close()
+    out = sink.open_sink(out_filename, format, compress, rotate_bytes)
+    try:
+        for i in range(start, end + 1):
+            v123list_str = v123list_list_str[i - 1]
+            v123list = StringToList(v123list_str)
+            print(toString(v123list))
+            sink.write(out, '------'+ toString(v123list) + '------')
+            minimal = auto_search(v123list, primary_bound, final_bound, step_size)
+            for l in minimal:
+                sink.write(out, toString(l))
+            # the minimal boxes of each line are written before the next line is searched
+            sink.flush(out)
+    finally:
+        sink.close(out)
+
+if __name__ == '__main__':
+    #m = bound
+    m = 6
+    #choose the starting & ending id in the list of first three vertices
+    start, end = 1, 1086
+    search_file('v123_max_%d.txt' % m, '3d_minimal_max_%d.txt' % (m), start, end)
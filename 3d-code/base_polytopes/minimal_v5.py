@@ -1,9 +1,7 @@
 import numpy as np
-from scipy.spatial import ConvexHull
-import basic
-from check import checkn, checkn_non_primitive
-from solve3 import solve, solve_lattice 
-import convex
+from .check import checkn_non_primitive
+from . import convex
+from . import sink
 import copy
 from math import gcd
 
@@ -27,6 +25,7 @@ def equal(v1, v2):
     return v1[0] == v2[0] and v1[1] == v2[1] and v1[2] == v2[2]
 
 def good_dual_base_v5(vlist):
+    from scipy.spatial import ConvexHull
     if checkn_non_primitive(vlist):
         hull = ConvexHull(vlist)
         if len(hull.vertices) == 5:
@@ -34,6 +33,7 @@ def good_dual_base_v5(vlist):
     return False
 
 def has_smaller_box(vlist):
+    from scipy.spatial import ConvexHull
     hull = ConvexHull(vlist)
     points = convex.get_integer_points_in_convex_hull(hull)
     for v in vlist:
@@ -118,25 +118,29 @@ def auto_search_v5(fix_vlist, primary_bound, final_bound, step_size):
     minimal_full = minimal_primary + minimal_near
     return minimal_full
 
-if __name__ == '__main__':
-    #Similar to 4 vertices case
-    bound1, bound2 = 1, 6
-    start, end = 1501, 1911
-    v123_file_name = 'v123_bound_%d_to_%d.txt' % (bound1, bound2)
-    out_filename = '3d_minimal_bound_%d_to_%d_ord_%d_to_%d.txt' % (bound1, bound2, start, end)
+#Similar to 4 vertices case
+def search_file_v5(v123_file_name, out_filename, start, end, primary_bound = 4, final_bound = 10, step_size = 2, format = 'text', compress = False, rotate_bytes = None):
     with open(v123_file_name, 'r') as v_file:
         v123list_list_str = v_file.readlines()
         v_file.close()
-    with open(out_filename, 'w') as file:
+    out = sink.open_sink(out_filename, format, compress, rotate_bytes)
+    try:
         for i in range(start, end + 1):
             v123list_str = v123list_list_str[i - 1]
             v123list = StringToList(v123list_str)
             print(toString(v123list))
-            file.write('------'+ toString(v123list) + '------\n')
-            primary_bound = 4
-            final_bound = 10
-            step_size = 2
+            sink.write(out, '------'+ toString(v123list) + '------')
             minimal = auto_search_v5(v123list, primary_bound, final_bound, step_size)
             for l in minimal:
-                file.write(toString(l) + '\n')
-        file.close()
+                sink.write(out, toString(l))
+            # the minimal boxes of each line are written before the next line is searched
+            sink.flush(out)
+    finally:
+        sink.close(out)
+
+if __name__ == '__main__':
+    bound1, bound2 = 1, 6
+    start, end = 1501, 1911
+    v123_file_name = 'v123_bound_%d_to_%d.txt' % (bound1, bound2)
+    out_filename = '3d_minimal_bound_%d_to_%d_ord_%d_to_%d.txt' % (bound1, bound2, start, end)
+    search_file_v5(v123_file_name, out_filename, start, end)
@@ -1,12 +1,13 @@
 import numpy as np
-from scipy.spatial import ConvexHull
-from scipy.spatial._qhull import QhullError
-from basic import divisor, sign, insiden
-from solve3 import solve, solve_lattice
-from check import primitive
+from .basic import divisor, sign, insiden
+from .solve3 import solve
+from .lattice_hull import lattice_hull_points
+from .check import primitive
+from . import kernels
 
 #To get the points inside a given polytope
 def gen_inside_points(vlist):
+    from scipy.spatial import ConvexHull
     hull = ConvexHull(vlist)
     facets = hull.simplices
     ineqs = []
@@ -28,6 +29,7 @@ def gen_inside_points(vlist):
 
 #generate the primitive rays in a polytope
 def gen_rays(vlist):
+    from scipy.spatial import ConvexHull
     hull = ConvexHull(vlist)
     facets = hull.simplices
     #print(facets)
@@ -62,58 +64,77 @@ def order(ray , poly_vertices_list: list , offset):
             min_us.append(u)
     return my_order, min_us
 
+#Vertices of a polytope which is not 3-dimensional, using coordinates in the span of its points
+def flat_vertices(points):
+    from scipy.spatial import ConvexHull
+    diff = np.array([np.array(p - points[0], dtype = float) for p in points])
+    rank = np.linalg.matrix_rank(diff)
+    if rank == 0:
+        return [points[0]]
+    coords = diff @ np.linalg.svd(diff)[2][:rank].T
+    if rank == 1:
+        return [points[int(np.argmin(coords[:, 0]))], points[int(np.argmax(coords[:, 0]))]]
+    hull = ConvexHull(coords)
+    return [points[_] for _ in hull.vertices]
+
+#Gauge group on the divisor of one ray from the vanishing orders of f and g, in any dimension
+#vecf, vecg are the points of the F and G polytopes where the orders are reached, None if there is no gauge group
+def classify(ordf, vecf, ordg, vecg):
+    if ordf == 1 and ordg >= 2:
+        return 'SU2'
+    elif ordf>=2 and ordg == 2:
+        if len(vecg) == 1 and divisor(vecg[0]) % 2 == 0:
+            return 'SU3'
+        return 'SU2'
+    elif ordf >= 3 and ordg == 4:
+        if len(vecg) == 1 and divisor(vecg[0]) % 2 == 0:
+            return 'E6'
+        return 'F4'
+    elif ordf == 3 and ordg >= 5:
+        return 'E7'
+    elif ordf >= 4 and ordg == 5:
+        return 'E8'
+    elif ordf == 2 and ordg >= 4:
+        if len(vecf) == 1 and divisor(vecf[0]) % 2 == 0:
+            return 'SO8'
+        return 'SO7'
+    elif ordf >= 3 and ordg == 3:
+        if len(vecg) == 1 and divisor(vecg[0]) % 3 == 0:
+            return 'SO8'
+        return 'G2'
+    elif ordf == 2 and ordg == 3:
+        if ((len(vecf) + len(vecg) == 2 and divisor(vecf[0]) % 2 == 0) and divisor(vecg[0])%3 == 0):
+            return 'SO8'
+        return 'G2'
+    return None
+
+#Count the gauge groups of the rays, given the vertices of the integer hulls of the F and G polytopes, in any dimension
+def count_gauge(rays, fpoly_vertices_list, gpoly_vertices_list):
+    gauge = {'SU2':0,'SU3':0,'G2':0,'SO7':0,'SO8':0,'F4':0,'E6':0,'E7':0,'E8':0}
+    forders = kernels.orders(rays, fpoly_vertices_list, 4)
+    gorders = kernels.orders(rays, gpoly_vertices_list, 6)
+    for i, ray in enumerate(rays):
+        ordf, vecf = order(ray, fpoly_vertices_list, 4) if forders is None else forders[i]
+        ordg, vecg = order(ray, gpoly_vertices_list, 6) if gorders is None else gorders[i]
+        group = classify(ordf, vecf, ordg, vecg)
+        if group is not None:
+            gauge[group] += 1
+    return gauge
+
 #compute the gauge factor of rays in a given polytope
 def determine_gauge(vlist):
-    gauge = {'SU2':0,'SU3':0,'G2':0,'SO7':0,'SO8':0,'F4':0,'E6':0,'E7':0,'E8':0}
-    fpoly = solve_lattice(vlist, 4)
-    gpoly = solve_lattice(vlist, 6)
+    from scipy.spatial import ConvexHull
+    from scipy.spatial._qhull import QhullError
+    fpoly = lattice_hull_points(vlist, 4)
+    gpoly = lattice_hull_points(vlist, 6)
     try:
         fhull = ConvexHull(fpoly)
         fpoly_vertices_list = [fhull.points[_] for _ in fhull.vertices]
     except QhullError:
-        x = fpoly[0][0]
-        fpoly_yz = [s[1:] for s in fpoly]
-        fhull = ConvexHull(fpoly_yz)
-        fpoly_yz_vertices_list = [fhull.points[_] for _ in fhull.vertices]
-        fpoly_vertices_list = [np.array([x, _[0], _[1]], dtype = object) for _ in fpoly_yz_vertices_list]
+        fpoly_vertices_list = flat_vertices(fpoly)
     ghull = ConvexHull(gpoly)
     gpoly_vertices_list = [ghull.points[_] for _ in ghull.vertices]
-    rays = gen_rays(vlist)
-    for ray in rays:
-        ordf, vecf = order(ray, fpoly_vertices_list, 4)
-        ordg, vecg = order(ray, gpoly_vertices_list, 6)
-        if ordf == 1 and ordg >= 2:
-            gauge['SU2'] += 1
-        elif ordf>=2 and ordg == 2:
-            if len(vecg) == 1 and divisor(vecg[0]) % 2 == 0:
-                gauge['SU3'] += 1
-            else:
-                gauge['SU2'] += 1
-        elif ordf >= 3 and ordg == 4:
-            if len(vecg) == 1 and divisor(vecg[0]) % 2 == 0:
-                gauge['E6'] += 1
-            else:
-                gauge['F4'] += 1
-        elif ordf == 3 and ordg >= 5:
-            gauge['E7']+=1
-        elif ordf >= 4 and ordg == 5:
-            gauge['E8'] += 1
-        elif ordf == 2 and ordg >= 4:
-            if len(vecf) == 1 and divisor(vecf[0]) % 2 == 0:
-                gauge['SO8'] += 1
-            else:
-                gauge['SO7'] += 1
-        elif ordf >= 3 and ordg == 3:
-            if len(vecg) == 1 and divisor(vecg[0]) % 3 == 0:
-                gauge['SO8'] += 1
-            else:
-                gauge['G2'] += 1
-        elif ordf == 2 and ordg == 3:
-            if ((len(vecf) + len(vecg) == 2 and divisor(vecf[0]) % 2 == 0) and divisor(vecg[0])%3 == 0):
-                gauge['SO8'] += 1
-            else:
-                gauge['G2'] += 1
-    return gauge
+    return count_gauge(gen_rays(vlist), fpoly_vertices_list, gpoly_vertices_list)
 
 if __name__ == '__main__':
     print('----------test gauge.py----------')
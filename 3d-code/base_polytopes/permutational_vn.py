@@ -1,6 +1,4 @@
 import numpy as np
-from sympy import Matrix
-from sympy.matrices.normalforms import hermite_normal_form
 
 def toString(vlist):
     s = ''
@@ -83,7 +81,7 @@ def check_perm(filename, outfilename, perm_list, n):
         outfile.close()
     return goodbase
 
-
-n = 4
-perm_list = generate_permutations(n)
-check_perm('full_minimal_test.txt', 'full_minimal_perm_test.txt', perm_list, n)
+if __name__ == '__main__':
+    n = 4
+    perm_list = generate_permutations(n)
+    check_perm('full_minimal_test.txt', 'full_minimal_perm_test.txt', perm_list, n)
@@ -0,0 +1,364 @@
+import math
+import numpy as np
+from functools import lru_cache
+from .basic import divisor
+from .lattice_hull import dual_bounds, hull_2d
+from .new_gauge import count_gauge
+from .aggregate import new_stats, update, update_many, update_rejected, merge
+
+#2d Monte Carlo: random polygons in the k-dual of a minimal 2d base, as MonteCarlon in 2d/MonteCarlo-2D.nb
+#The box points are sorted by angle and a sample is an array of their indices, check_batch checks many samples at once with numpy
+
+#Vertices of the minimal 2d bases as in 2d-code, m = 13 for P2 and m = 0, ..., 12 for the Hirzebruch surface F_m
+def minimal_base(m):
+    if m == 13 or m == -1:
+        return [(1, 0), (0, 1), (-1, -1)]
+    if 0 <= m <= 12:
+        return [(1, 0), (0, 1), (-1, m), (0, -1)]
+    raise ValueError('m should be 0, ..., 12 for F_m or 13 for P2')
+
+#Integer points of the k-dual {u|<u,v> >= -k, v in vlist}, an array of shape (N, 2), with exact bounds in each column u[0] = x
+def dual_points(vlist, k):
+    A = np.array([[int(v[0]), int(v[1])] for v in vlist], dtype = np.int64)
+    lower, upper = dual_bounds(vlist, k)
+    x = np.arange(lower[0], upper[0] + 1, dtype = np.int64)
+    # the inequalities in the column x are A[:, 1] * y >= rhs
+    rhs = -k - A[:, 0][:, None] * x[None, :]
+    coef = A[:, 1]
+    lo = np.full(len(x), lower[1], dtype = np.int64)
+    hi = np.full(len(x), upper[1], dtype = np.int64)
+    pos, neg, zero = coef > 0, coef < 0, coef == 0
+    if pos.any():
+        lo = np.maximum(lo, (-((-rhs[pos]) // coef[pos][:, None])).max(axis = 0))
+    if neg.any():
+        hi = np.minimum(hi, (rhs[neg] // coef[neg][:, None]).min(axis = 0))
+    valid = lo <= hi
+    if zero.any():
+        valid &= (rhs[zero] <= 0).all(axis = 0)
+    x, lo, hi = x[valid], lo[valid], hi[valid]
+    lengths = hi - lo + 1
+    xs = np.repeat(x, lengths)
+    ys = np.repeat(lo - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+    return np.stack([xs, ys], axis = 1)
+
+#Sort 2d points by their angle in [0, 2pi) from the positive x axis
+def angle_order(points):
+    points = np.asarray(points, dtype = np.int64)
+    angles = np.arctan2(points[:, 1], points[:, 0]) % (2 * np.pi)
+    return points[np.argsort(angles, kind = 'stable')]
+
+#Primitive rays in the k-dual of the polygon sorted by angle, for a minimal base this is the box of the Monte Carlo
+def box_rays(vlist, k = 6):
+    points = dual_points(vlist, k)
+    return angle_order(points[np.gcd(points[:, 0], points[:, 1]) == 1])
+
+#Primitive rays in the polygon sorted by angle, which are the toric rays of the base
+def polygon_rays(vlist):
+    vertices = np.array(hull_2d([(int(v[0]), int(v[1])) for v in vlist]), dtype = np.int64)
+    lower, upper = vertices.min(axis = 0), vertices.max(axis = 0)
+    x, y = np.meshgrid(np.arange(lower[0], upper[0] + 1), np.arange(lower[1], upper[1] + 1), indexing = 'ij')
+    points = np.stack([x.ravel(), y.ravel()], axis = 1)
+    edges = np.roll(vertices, -1, axis = 0) - vertices
+    turn = edges[:, 0][None, :] * (points[:, 1][:, None] - vertices[:, 1][None, :]) - edges[:, 1][None, :] * (points[:, 0][:, None] - vertices[:, 0][None, :])
+    points = points[(turn >= 0).all(axis = 1) & (np.gcd(points[:, 0], points[:, 1]) == 1)]
+    return angle_order(points)
+
+#Whether the origin is strictly inside the convex hull of the points
+def origin_inside(points):
+    vertices = hull_2d([(int(p[0]), int(p[1])) for p in points])
+    if len(vertices) < 3:
+        return False
+    return all(a[0] * b[1] - a[1] * b[0] > 0 for a, b in zip(vertices, vertices[1:] + vertices[:1]))
+
+#2d version of checkn for a polygon in any box, as checknG of the notebook: the vertices are primitive, the origin is strictly inside
+#and the integer hull of the k-dual contains the origin strictly inside
+def checkn_2d(vlist, k = 6):
+    vertices = hull_2d([(int(v[0]), int(v[1])) for v in vlist])
+    if not origin_inside(vertices):
+        return False
+    if any(divisor(v) != 1 for v in vertices):
+        return False
+    return origin_inside(dual_points(vertices, k))
+
+#Self-intersection numbers of the divisors of the rays sorted by angle, from c * r + r_prev + r_next = 0 as in 2d-code
+def intersections(rays):
+    rays = np.asarray(rays, dtype = np.int64)
+    s = np.roll(rays, 1, axis = 0) + np.roll(rays, -1, axis = 0)
+    return tuple((-(s * rays).sum(axis = 1) // (rays * rays).sum(axis = 1)).tolist())
+
+#Lexicographically first sequence under rotations and reflections, the canonical form of 2d-code
+def canonical(seq):
+    seq = tuple(seq)
+    forms = [seq[i:] + seq[:i] for i in range(len(seq))]
+    forms += [tuple(reversed(f)) for f in forms]
+    return min(forms)
+
+#Gauge groups of a good polygon, rays are computed from the vertices if they are not given
+def determine_gauge_2d(vlist, rays = None):
+    vertices = hull_2d([(int(v[0]), int(v[1])) for v in vlist])
+    if rays is None:
+        rays = polygon_rays(vertices)
+    fpoly = hull_2d([tuple(p) for p in dual_points(vertices, 4).tolist()])
+    gpoly = hull_2d([tuple(p) for p in dual_points(vertices, 6).tolist()])
+    return count_gauge([tuple(r) for r in np.asarray(rays).tolist()], fpoly, gpoly)
+
+#Bitmasks over the box points are packed in words of 64 bits, bit i of the mask is bit i % 64 of word i // 64
+def pack(mask):
+    words = (mask.shape[-1] + 63) // 64
+    packed = np.packbits(mask, axis = -1, bitorder = 'little')
+    pad = [(0, 0)] * (mask.ndim - 1) + [(0, words * 8 - packed.shape[-1])]
+    return np.ascontiguousarray(np.pad(packed, pad)).view('<u8').astype(np.uint64)
+
+def unpack(words, n):
+    return np.unpackbits(np.ascontiguousarray(words).astype('<u8').view(np.uint8), axis = -1, bitorder = 'little')[..., :n].astype(bool)
+
+def popcount(words):
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(words).sum(axis = -1).astype(np.int64)
+    return unpack(words, words.shape[-1] * 64).sum(axis = -1)
+
+#Tables of a box for check_batch. side[a, b] is the bitmask of the box points c with (b - a) x (c - a) >= 0, without the points
+#on the line behind a. A polygon has an edge starting at its vertex a (and going to b) iff all its points are in side[a, b]
+def box_tables(points):
+    points = np.asarray(points, dtype = np.int64)
+    n = len(points)
+    side = np.zeros((n, n, (n + 63) // 64), dtype = np.uint64)
+    for a in range(n):
+        d = points - points[a]
+        turn = d[:, 0][:, None] * d[:, 1][None, :] - d[:, 1][:, None] * d[:, 0][None, :]
+        mask = (turn >= 0) & ~((turn == 0) & (d @ d.T < 0))
+        mask[a] = False
+        side[a] = pack(mask)
+    cross = points[:, 0][:, None] * points[:, 1][None, :] - points[:, 1][:, None] * points[:, 0][None, :]
+    # the box points on their bounding box, to look up the images of polygons
+    lower = points.min(axis = 0)
+    grid = np.zeros(tuple(points.max(axis = 0) - lower + 1), dtype = bool)
+    grid[tuple((points - lower).T)] = True
+    return {'points': points, 'side': side, 'cross': cross, 'grid': grid, 'lower': lower, 'pairs': {}}
+
+#Pairs of indices (a, b) of box points with points[a] x points[b] = c, computed once for each box and each c
+def cross_pairs(tables, c):
+    if c not in tables['pairs']:
+        tables['pairs'][c] = np.argwhere(tables['cross'] == c)
+    return tables['pairs'][c]
+
+#Number of distinct images g P in the box, g in GL(2,Z), which is 1 + rgl of RGL in the notebook (there over a list of words)
+#Two vertices v0, v1 of P with v0 x v1 = c are sent to box points u0, u1 with u0 x u1 = +-c, which fixes g = U V^-1, in GL(2,Z)
+#if it is integral, and g is kept if all the vertices are sent into the box. Each image is given by |Aut(P)| of them, the g with g P = P
+def box_images_2d(tables, vertices):
+    vertices = np.asarray(vertices, dtype = np.int64)
+    crosses = vertices[:, 0][:, None] * vertices[:, 1][None, :] - vertices[:, 1][:, None] * vertices[:, 0][None, :]
+    a, b = min(np.argwhere(crosses != 0).tolist(), key = lambda p: abs(crosses[p[0], p[1]]))
+    c = int(crosses[a, b])
+    # columns of V are v0, v1, and adj V = c V^-1
+    adj = np.array([[vertices[b, 1], -vertices[b, 0]], [-vertices[a, 1], vertices[a, 0]]], dtype = np.int64)
+    pairs = np.concatenate([cross_pairs(tables, c), cross_pairs(tables, -c)])
+    g = tables['points'][pairs].transpose(0, 2, 1) @ adj
+    g = g[(g % c == 0).all(axis = (1, 2))] // c
+    # rows of vertices g^T are the images g v
+    images = vertices @ g.transpose(0, 2, 1) - tables['lower']
+    inside = ((images >= 0) & (images < tables['grid'].shape)).all(axis = (1, 2))
+    images = images[inside]
+    images = images[tables['grid'][images[..., 0], images[..., 1]].all(axis = 1)]
+    vset = set(map(tuple, (vertices - tables['lower']).tolist()))
+    stabilizer = sum(set(map(tuple, image.tolist())) == vset for image in images)
+    return len(images) // stabilizer
+
+#Check a batch of samples, idx has shape (samples, points in a sample) and contains indices of box points, repetitions are allowed
+#Returns whether the origin is strictly inside each polygon, and the bitmasks of its rays (all box points in it) and of its vertices
+def check_batch(tables, idx):
+    samples, npoints = idx.shape
+    n = len(tables['points'])
+    rows = np.repeat(np.arange(samples), npoints)
+    chosen = np.zeros((samples, n), dtype = bool)
+    chosen[rows, idx.ravel()] = True
+    chosen = pack(chosen)
+    side = tables['side'][idx[:, :, None], idx[:, None, :]]
+    edge = ((chosen[:, None, None, :] & ~side) == 0).all(axis = -1)
+    good = edge.any(axis = (1, 2)) & np.where(edge, tables['cross'][idx[:, :, None], idx[:, None, :]] > 0, True).all(axis = (1, 2))
+    rays = np.where(edge[..., None], side, ~np.uint64(0)).reshape(samples, npoints * npoints, -1)
+    rays = np.bitwise_and.reduce(rays, axis = 1)
+    vertices = np.zeros((samples, n), dtype = bool)
+    first = edge.any(axis = 2)
+    vertices[np.nonzero(first)[0], idx[first]] = True
+    return good, rays, pack(vertices)
+
+#Number of tuples of npoints rays of a polygon with r rays that contain its m vertices which are not fixed,
+#the same as RedFactor of the notebook
+@lru_cache(maxsize = None)
+def multiplicity(r, m, npoints):
+    return sum((-1) ** i * math.comb(m, i) * (r - i) ** npoints for i in range(m + 1))
+
+#Monte Carlo in one box: totN samples of npoints random box points and the fixed box points (indices in points)
+#A good polygon is added to the statistics of aggregate.py with weight len(points) ** npoints / multiplicity, so that the mean weight
+#per sample estimates the number of polygons in the box (all SL(2,Z) images are counted) with at most npoints + len(fixed) vertices
+#With redundancy = True the weight is also divided by the number of GL(2,Z) images of the polygon in the box, as the weight (1 + rgl)
+#of the notebook, and the mean weight estimates the number of distinct bases instead
+#In a box which is not the k-dual of a minimal base (canonical = False), the k-dual of each polygon is also checked
+def sample_box(points, npoints, totN, fixed = (), k = 6, canonical = True, gauge = False, seed = None, box = '2d', batch = None, redundancy = False):
+    tables = box_tables(points)
+    points = tables['points']
+    n = len(points)
+    rng = np.random.default_rng(seed)
+    stats = new_stats()
+    fixed = np.array(fixed, dtype = np.int64)
+    fixed_mask = np.zeros(n, dtype = bool)
+    fixed_mask[fixed] = True
+    fixed_mask = pack(fixed_mask)
+    width = npoints + len(fixed)
+    total = n ** npoints
+    if batch is None:
+        batch = max(1, 2 ** 22 // (width * width * tables['side'].shape[-1]))
+    done = 0
+    while done < totN:
+        size = min(batch, totN - done)
+        idx = np.concatenate([rng.integers(0, n, size = (size, npoints)), np.broadcast_to(fixed, (size, len(fixed)))], axis = 1)
+        good, rays, vertices = check_batch(tables, idx)
+        rays, vertices = rays[good], vertices[good]
+        if not canonical and len(rays) > 0:
+            kept = np.array([checkn_2d(points[v], k) for v in unpack(vertices, n)], dtype = bool)
+            rays, vertices = rays[kept], vertices[kept]
+        r = popcount(rays)
+        m = popcount(vertices & ~fixed_mask)
+        weights = np.array([total / multiplicity(a, b, npoints) for a, b in zip(r.tolist(), m.tolist())], dtype = float)
+        if redundancy and len(r) > 0:
+            weights /= [box_images_2d(tables, points[v]) for v in unpack(vertices, n)]
+        if gauge:
+            for ray_mask, vertex_mask, h11, weight in zip(unpack(rays, n), unpack(vertices, n), (r - 2).tolist(), weights.tolist()):
+                update(stats, box, h11, determine_gauge_2d(points[vertex_mask], points[ray_mask]), weight)
+        else:
+            update_many(stats, box, r - 2, weights)
+        update_rejected(stats, box, size - len(r))
+        done += size
+    return stats
+
+#sample_box in several processes with independent random streams, the statistics are merged
+def run(points, npoints, totN, fixed = (), k = 6, canonical = True, gauge = False, seed = None, box = '2d', workers = None, redundancy = False):
+    from multiprocessing import Pool, cpu_count
+    if workers is None:
+        workers = cpu_count()
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    counts = [totN // workers + (1 if i < totN % workers else 0) for i in range(workers)]
+    jobs = [(points, npoints, c, fixed, k, canonical, gauge, s, box, None, redundancy) for c, s in zip(counts, seeds)]
+    if workers == 1:
+        results = [sample_box(*jobs[0])]
+    else:
+        with Pool(workers) as pool:
+            results = pool.starmap(sample_box, jobs)
+    stats = new_stats()
+    for s in results:
+        stats = merge(stats, s)
+    return stats
+
+#Estimated number of polygons in the box for each number of rays (h11 + 2), from the statistics of one box
+#With the statistics of run(..., redundancy = True) this is the estimated number of polygons up to GL(2,Z) instead
+def estimate_counts(stats, box):
+    samples = stats['boxes'][box]['samples']
+    return {h11 + 2: w / samples for h11, w in sorted(stats['wh11'].items())}
+
+#All good polygons of a box, found as in down.jl of 2d-code by removing one vertex at a time, starting from the box
+#The box should be the k-dual of a minimal base, then the k-dual of each polygon in it is good
+#Returns {number of rays: set of polygons}, a polygon is the bitmask (python integer) of its rays over the box points
+def enumerate_box(points, smallest = 3):
+    points = [tuple(p) for p in np.asarray(points).tolist()]
+    index = {p: i for i, p in enumerate(points)}
+    n = len(points)
+    levels = {n: {(1 << n) - 1}}
+    while n > smallest:
+        level = set()
+        for mask in levels[n]:
+            for v in hull_2d([p for i, p in enumerate(points) if mask >> i & 1]):
+                new = mask & ~(1 << index[v])
+                if new not in level and origin_inside([p for i, p in enumerate(points) if new >> i & 1]):
+                    level.add(new)
+        n -= 1
+        levels[n] = level
+    return levels
+
+#Canonical self-intersection numbers of the polygons of enumerate_box with their number of SL(2,Z) images in the box,
+#which is the content of the files blowdown-canonical-k*-m*-n* of down.jl
+def canonical_counts(points, polygons):
+    counts = {}
+    for mask in polygons:
+        form = canonical(intersections([p for i, p in enumerate(np.asarray(points).tolist()) if mask >> i & 1]))
+        counts[form] = counts.get(form, 0) + 1
+    return counts
+
+#Read the output files of 2d-code: collection-x of generate.jl, blowdown-canonical-k*-m*-n* of down.jl, and *.m lists like sizes.m
+def read_collection(filename):
+    with open(filename, 'r') as file:
+        return {tuple(int(x) for x in line.split()) for line in file if line.strip() and not line.startswith('#')}
+
+def read_blowdown(filename):
+    import re
+    with open(filename, 'r') as file:
+        return {tuple(int(x) for x in seq.split(',')): int(count) for seq, count in re.findall(r'\{\[([^\]]*)\], (\d+)\}', file.read())}
+
+def read_sizes(filename):
+    import re
+    with open(filename, 'r') as file:
+        return {int(n): int(count) for n, count in re.findall(r'\{(\d+), (\d+)\}', file.read())}
+
+#Compare enumerate_box with the outputs of 2d-code for the boxes m = 0, ..., 2k and 13, files which are not there are skipped
+#Returns the list of differences, which is empty if everything agrees
+def compare_2d_code(k, test_g, test_d):
+    import os
+    differences = []
+    collections = {}
+    for m in list(range(2 * k + 1)) + [13]:
+        points = box_rays(minimal_base(m), k)
+        for n, polygons in enumerate_box(points).items():
+            counts = canonical_counts(points, polygons)
+            collections.setdefault(n, set()).update(counts)
+            filename = os.path.join(test_d, 'blowdown-canonical-k%d-m%d-n%d' % (k, m, n))
+            if os.path.exists(filename) and read_blowdown(filename) != counts:
+                differences.append(filename)
+    for n, forms in collections.items():
+        filename = os.path.join(test_g, 'collection-%d' % n)
+        if os.path.exists(filename) and read_collection(filename) != forms:
+            differences.append(filename)
+    filename = os.path.join(test_g, 'sizes.m')
+    if os.path.exists(filename):
+        for n, count in read_sizes(filename).items():
+            if len(collections.get(n, ())) != count:
+                differences.append('%s n=%d' % (filename, n))
+    return differences
+
+if __name__ == '__main__':
+    import os
+    import time
+    print('----------test polygon.py----------')
+    #test codes
+    code_2d = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '2d-code')
+    differences = compare_2d_code(1, os.path.join(code_2d, 'test-g'), os.path.join(code_2d, 'test-d'))
+    print('differences with 2d-code k=1:', differences)
+    #the Monte Carlo estimate of the number of polygons in the box of F_0 at k=1 against the exact enumeration
+    points = box_rays(minimal_base(0), 1)
+    exact = {n: len(polygons) for n, polygons in enumerate_box(points).items() if polygons}
+    stats = run(points, len(points), 2 * 10 ** 5, k = 1, seed = 1, box = 'k1-m0', workers = 2)
+    print('exact:', exact)
+    print('estimate:', {n: round(c, 2) for n, c in estimate_counts(stats, 'k1-m0').items()})
+    #with the GL(2,Z) redundancy, against the number of canonical self-intersection sequences
+    tables = box_tables(points)
+    classes = {n: len(canonical_counts(points, polygons)) for n, polygons in enumerate_box(points).items() if polygons}
+    images = {n: sum(1 / box_images_2d(tables, hull_2d([tuple(p) for i, p in enumerate(points.tolist()) if mask >> i & 1])) for mask in polygons)
+              for n, polygons in enumerate_box(points).items() if polygons}
+    stats = run(points, len(points), 2 * 10 ** 5, k = 1, seed = 1, box = 'k1-m0', workers = 2, redundancy = True)
+    print('classes:', classes, 'sum of 1/images:', {n: round(c, 2) for n, c in images.items()})
+    print('estimate:', {n: round(c, 2) for n, c in estimate_counts(stats, 'k1-m0').items()})
+    #check_batch against checkn_2d and polygon_rays one polygon at a time, in a box with low and in a box with high acceptance
+    for m in [12, 0]:
+        points = box_rays(minimal_base(m), 6)
+        tables = box_tables(points)
+        idx = np.random.default_rng(m).integers(0, len(points), size = (2000, 10))
+        start = time.time()
+        good, rays, vertices = check_batch(tables, idx)
+        vector_time = time.time() - start
+        start = time.time()
+        scalar = [checkn_2d(points[i], 6) for i in idx]
+        scalar_rays = [len(polygon_rays(points[i])) if g else 0 for i, g in zip(idx, scalar)]
+        scalar_time = time.time() - start
+        print('box of m=%d at k=6 with %d rays, acceptance %.3f, agreement:' % (m, len(points), good.mean()), bool((good == np.array(scalar)).all() and (popcount(rays)[good] == np.array(scalar_rays)[good]).all()))
+        print('samples per second, vectorized: %d, one by one: %d' % (len(idx) / vector_time, len(idx) / scalar_time))
+    print(determine_gauge_2d([(-6, 1), (-6, -6), (78, -6)]))
+    print('----------test polygon.py end----------')
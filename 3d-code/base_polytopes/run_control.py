@@ -0,0 +1,140 @@
+import numpy as np
+import math
+import random
+import json
+import os
+from .check import checkn
+from .new_gauge import gen_rays, determine_gauge
+from .lattice_hull import lattice_hull
+from .fix_check import read_gpolytopes, toString, fixed_candidates, gen_vlist, choose_fixed
+from . import aggregate
+from . import sink
+
+#Estimates of the statistics of aggregate.py with the half width of the confidence interval, z = 1.96 for 95%
+def estimates(stats, z = 1.96):
+    m = stats['moments']
+    n, good = sum(b['samples'] for b in stats['boxes'].values()), m['n']
+    est = {'samples': n, 'good': good}
+    if n == 0:
+        return est
+    p = good / n
+    est['acceptance'] = (p, z * math.sqrt(p * (1 - p) / n))
+    if good < 2:
+        return est
+    mean = m['h11'] / good
+    var = max(m['h11_2'] / good - mean ** 2, 0) * good / (good - 1)
+    est['h11'] = (mean, z * math.sqrt(var / good))
+    # ratio estimator for the weighted mean
+    wmean = m['wh11'] / m['w']
+    wvar = max(m['w2h11_2'] - 2 * wmean * m['w2h11'] + wmean ** 2 * m['w2'], 0) / m['w'] ** 2
+    est['weighted_h11'] = (wmean, z * math.sqrt(wvar))
+    # the gauge groups are only there when they were computed (run_box with gauge)
+    boxes = stats['boxes'].values()
+    gauge_good, gauge_w = sum(b['gauge_good'] for b in boxes), sum(b['gauge_w'] for b in boxes)
+    if gauge_good > 0:
+        est['gauge'] = {g: sum(b['gauge'][i] for b in boxes) / gauge_good for i, g in enumerate(aggregate.gauge_groups)}
+        est['weighted_gauge'] = {g: sum(b['wgauge'][i] for b in boxes) / gauge_w for i, g in enumerate(aggregate.gauge_groups)}
+    return est
+
+#Largest relative error of the acceptance and of the (weighted) mean h11
+def relative_error(stats, z = 1.96):
+    est = estimates(stats, z)
+    if 'h11' not in est:
+        return math.inf
+    errors = []
+    for key in ['acceptance', 'h11', 'weighted_h11']:
+        mean, width = est[key]
+        errors.append(width / abs(mean) if mean != 0 else math.inf)
+    return max(errors)
+
+#Write the checkpoint to a temporary file first, so that an interruption never leaves a broken checkpoint
+#output is the position of the output sink (sink.position) at the checkpoint
+def save_checkpoint(filename, times, metadata, stats, output = None):
+    state = random.getstate()
+    checkpoint = {'times': times, 'metadata': metadata, 'stats': stats, 'random': [state[0], list(state[1]), state[2]], 'output': output}
+    with open(filename + '.tmp', 'w') as file:
+        json.dump(checkpoint, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(filename + '.tmp', filename)
+
+#Restore the random state and return the number of samples done, the metadata, the statistics of aggregate.py
+#and the position of the output sink
+def load_checkpoint(filename):
+    with open(filename, 'r') as file:
+        checkpoint = json.load(file)
+    state = checkpoint['random']
+    random.setstate((state[0], tuple(state[1]), state[2]))
+    return checkpoint['times'], checkpoint['metadata'], aggregate.restore(checkpoint['stats']), checkpoint.get('output')
+
+#Monte Carlo in a given box until the relative error of the estimates reaches target, or maxN samples
+#The state is saved every check_every samples and the run is resumed from the checkpoint file if it exists
+#When the run is resumed, the output sink goes back to its position at the checkpoint, so the samples written after the
+#checkpoint are not written twice. Printed samples after the last checkpoint are printed again with the same numbers
+#The statistics of aggregate.py are the only running sums, the estimates and the stopping rule use them, and they are
+#saved in stats_file at the end
+#The output lines go to output, a sink of sink.py, if it is given, and are printed otherwise
+#stop is a threading.Event, once it is set the run returns None at once without saving anything (the scheduler sets it
+#when another worker took the box)
+def run_box(gpoly, npoints, target = 0.01, maxN = 10**7, checkpoint = None, check_every = 10**4, min_good = 100, gauge = False, weight = None, pilot_n = 200, max_fixed = 2, stats_file = None, output = None, stop = None):
+    if npoints <= 3:
+        print('Number of points should be greater than 3!')
+        return None
+    out = print if output is None else lambda line: sink.write(output, line)
+    primative_rays = gen_rays(lattice_hull(gpoly, 6)[0])
+    if checkpoint is not None and os.path.exists(checkpoint):
+        times, metadata, stats, position = load_checkpoint(checkpoint)
+        if output is not None and position is not None:
+            sink.rewind(output, position)
+        fixed_vlist = [np.array(v, dtype = object) for v in metadata['fixed_list']]
+        out('resume:%d' % times)
+    else:
+        candidates = fixed_candidates(gpoly, primative_rays)
+        fixed_vlist, rate, pilot = choose_fixed(primative_rays, candidates, npoints, pilot_n, max_fixed)
+        metadata = {'box': toString(gpoly), 'rays': len(primative_rays), 'fixed': toString(fixed_vlist), 'pilot_n': pilot_n, 'acceptance': rate, 'pilot': pilot}
+        metadata['fixed_list'] = [[int(x) for x in v] for v in fixed_vlist]
+        metadata['npoints'], metadata['target'] = npoints, target
+        times, stats = 0, aggregate.new_stats()
+        out('metadata:%s' % metadata)
+    while times < maxN:
+        if stop is not None and stop.is_set():
+            return None
+        try:
+            vlist = gen_vlist(primative_rays, fixed_vlist, npoints)
+        except Exception:
+            # flat samples are rejected, as in choose_fixed
+            vlist = None
+        times += 1
+        if vlist is not None and checkn(vlist):
+            rays = gen_rays(vlist)
+            h11 = len(rays) - 3
+            gauge_dict = determine_gauge(vlist) if gauge else None
+            w = 1 if weight is None else weight(vlist)
+            aggregate.update(stats, metadata['box'], h11, gauge_dict, w)
+            if weight is None:
+                out('%d: %s %d h11=%d' % (times, toString(vlist), len(vlist), h11))
+            else:
+                out('%d: %s %d h11=%d weight=%s' % (times, toString(vlist), len(vlist), h11, w))
+        else:
+            aggregate.update_rejected(stats, metadata['box'])
+        if times % check_every == 0:
+            if checkpoint is not None:
+                # the samples before the checkpoint are written first
+                save_checkpoint(checkpoint, times, metadata, stats, None if output is None else sink.position(output))
+            if stats['moments']['n'] >= min_good and relative_error(stats) <= target:
+                break
+    if checkpoint is not None:
+        save_checkpoint(checkpoint, times, metadata, stats, None if output is None else sink.position(output))
+    if stats_file is not None:
+        aggregate.save(stats, stats_file)
+    est = estimates(stats)
+    out('estimates:%s' % est)
+    return est
+
+if __name__ == '__main__':
+    print('----------test run_control.py----------')
+    #test codes
+    random.seed(0)
+    gpoly = read_gpolytopes('3d-G-polytopes.txt')[4]
+    run_box(gpoly, 30, target = 0.05, maxN = 2000, check_every = 100, min_good = 30, pilot_n = 20)
+    print('----------test run_control.py end----------')
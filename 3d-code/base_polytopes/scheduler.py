@@ -0,0 +1,164 @@
+import numpy as np
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+from .lattice_hull import lattice_hull
+from .fix_check import read_gpolytopes
+from .run_control import run_box
+from .weight import box_weight
+from . import sink
+
+#Fraction of primitive points among the lattice points, 1/zeta(3)
+primitive_density = 0.8319
+
+#Cheap features of the box dual to a G-polytope
+def box_features(gpoly):
+    from scipy.spatial import ConvexHull
+    vertices, facets = lattice_hull(gpoly, 6)
+    volume = ConvexHull(vertices).volume
+    return {'vertices': len(vertices), 'volume': volume, 'rays': primitive_density * volume}
+
+#Estimated cost of a box: every good sample enumerates the primitive rays of a polytope of the size of the box,
+#and the hull and dual computations grow with the number of vertices of the box
+def estimate_cost(features):
+    return features['rays'] * (1 + features['vertices'] / 10)
+
+def connect(db):
+    # no WAL journal, which does not work on network filesystems
+    conn = sqlite3.connect(db, timeout = 600, isolation_level = None)
+    conn.execute('PRAGMA journal_mode=DELETE')
+    return conn
+
+#Create the queue with one unit per box, config holds the parameters of run_box
+def init_queue(db, polytope_file, config, boxes = None):
+    gpolys = read_gpolytopes(polytope_file)
+    if boxes is None:
+        boxes = range(1, len(gpolys) + 1)
+    conn = connect(db)
+    conn.execute('CREATE TABLE IF NOT EXISTS config (key TEXT PRIMARY KEY, value TEXT)')
+    conn.execute('CREATE TABLE IF NOT EXISTS units (box INTEGER PRIMARY KEY, gpoly TEXT, features TEXT, cost REAL, status TEXT, attempts INTEGER, worker TEXT, lease REAL, error TEXT, result TEXT)')
+    conn.execute('INSERT OR REPLACE INTO config VALUES (?, ?)', ('run', json.dumps(config)))
+    for box in boxes:
+        gpoly = gpolys[box - 1]
+        features = box_features(gpoly)
+        conn.execute('INSERT OR IGNORE INTO units VALUES (?, ?, ?, ?, ?, 0, NULL, NULL, NULL, NULL)',
+                     (box, json.dumps([[int(x) for x in v] for v in gpoly]), json.dumps(features), estimate_cost(features), 'pending'))
+    conn.close()
+
+#Take the most expensive pending unit, units whose lease expired are given back to the queue first
+def claim(conn, worker, lease_time, max_attempts):
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        now = time.time()
+        conn.execute("UPDATE units SET status = 'pending', attempts = attempts + 1, error = 'lease expired' WHERE status = 'running' AND lease < ? AND attempts + 1 < ?", (now, max_attempts))
+        conn.execute("UPDATE units SET status = 'failed', attempts = attempts + 1, error = 'lease expired' WHERE status = 'running' AND lease < ?", (now,))
+        row = conn.execute("SELECT box, gpoly FROM units WHERE status = 'pending' ORDER BY cost DESC LIMIT 1").fetchone()
+        if row is not None:
+            conn.execute("UPDATE units SET status = 'running', worker = ?, lease = ? WHERE box = ?", (worker, now + lease_time, row[0]))
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    if row is None:
+        return None
+    return row[0], [np.array(v, dtype = object) for v in json.loads(row[1])]
+
+#renew, complete and fail only change a unit still running for this worker, renew returns False if the unit was lost
+def renew(conn, box, worker, lease_time):
+    return conn.execute("UPDATE units SET lease = ? WHERE box = ? AND worker = ? AND status = 'running'", (time.time() + lease_time, box, worker)).rowcount > 0
+
+def complete(conn, box, worker, result):
+    conn.execute("UPDATE units SET status = 'done', lease = NULL, result = ? WHERE box = ? AND worker = ? AND status = 'running'", (json.dumps(result), box, worker))
+
+#A failed unit goes back to the queue until it has failed max_attempts times
+def fail(conn, box, worker, error, max_attempts):
+    conn.execute("UPDATE units SET status = CASE WHEN attempts + 1 < ? THEN 'pending' ELSE 'failed' END, attempts = attempts + 1, lease = NULL, error = ? WHERE box = ? AND worker = ? AND status = 'running'",
+                 (max_attempts, error, box, worker))
+
+#Renew the lease of a running unit until stop is set, lost is set if the unit was given to another worker
+def heartbeat(db, box, worker, lease_time, stop, lost):
+    conn = connect(db)
+    while not stop.wait(lease_time / 3):
+        if not renew(conn, box, worker, lease_time):
+            lost.set()
+            break
+    conn.close()
+
+#Output file of box i, box-i.bin for the binary format of sink.py and with .gz when compressed
+def output_name(box, output):
+    name = 'box-%d.bin' % box if output.get('format', 'text') == 'binary' else 'box-%d.txt' % box
+    return name + '.gz' if output.get('compress', False) else name
+
+#Pull units from the queue until it is empty, the output of box i goes to box-i.txt, its checkpoint to box-i.json
+#and its statistics (aggregate.py) to box-i.stats.json in outdir
+#The output is written by a sink of sink.py with the options config['output'] (format, compress, rotate_bytes)
+#A worker which loses the lease of its unit stops run_box at once and drops the records it did not write yet
+def work(db, outdir, worker = None, lease_time = 3600, max_attempts = 3):
+    if worker is None:
+        worker = '%s-%d' % (socket.gethostname(), os.getpid())
+    os.makedirs(outdir, exist_ok = True)
+    conn = connect(db)
+    config = json.loads(conn.execute("SELECT value FROM config WHERE key = 'run'").fetchone()[0])
+    use_weight = config.pop('weight', False)
+    output = config.pop('output', {})
+    while True:
+        unit = claim(conn, worker, lease_time, max_attempts)
+        if unit is None:
+            break
+        box, gpoly = unit
+        stop, lost = threading.Event(), threading.Event()
+        beat = threading.Thread(target = heartbeat, args = (db, box, worker, lease_time, stop, lost), daemon = True)
+        beat.start()
+        try:
+            # a unit started again after a failure continues from its checkpoint, or else starts a new output
+            checkpoint = os.path.join(outdir, 'box-%d.json' % box)
+            out = sink.open_sink(os.path.join(outdir, output_name(box, output)), append = os.path.exists(checkpoint), **output)
+            try:
+                weight = box_weight(gpoly) if use_weight else None
+                est = run_box(gpoly, checkpoint = checkpoint, weight = weight, stats_file = os.path.join(outdir, 'box-%d.stats.json' % box), output = out, stop = lost, **config)
+            finally:
+                sink.close(out, discard = lost.is_set())
+            if not lost.is_set():
+                complete(conn, box, worker, est)
+        except Exception:
+            fail(conn, box, worker, traceback.format_exc(), max_attempts)
+        finally:
+            stop.set()
+            beat.join()
+    conn.close()
+
+#Number of units in each state
+def status(db):
+    conn = connect(db)
+    counts = dict(conn.execute('SELECT status, COUNT(*) FROM units GROUP BY status').fetchall())
+    conn.close()
+    return counts
+
+#Run nworkers workers on this machine
+def run_local(db, outdir, nworkers, lease_time = 3600, max_attempts = 3):
+    workers = [multiprocessing.Process(target = work, args = (db, outdir, 'local-%d' % i, lease_time, max_attempts)) for i in range(nworkers)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+
+def parse_boxes(s):
+    if s is None:
+        return None
+    boxes = []
+    for part in s.split(','):
+        if '-' in part:
+            a, b = part.split('-')
+            boxes += list(range(int(a), int(b) + 1))
+        else:
+            boxes.append(int(part))
+    return boxes
+
+if __name__ == '__main__':
+    from .cli import scheduler_main
+    scheduler_main()
@@ -0,0 +1,364 @@
+import os
+import gzip
+import queue
+import struct
+import threading
+import zlib
+
+#Output of the runs through a background thread: records are collected in batches, each batch is written by the thread
+#with one write and flushed, and the caller only waits when queue_size batches are already waiting
+#A record is one line of the legacy output, e.g. "12: (-6,-6,1)(-6,19,-6)(3,4,5)(1,2,-6) 4 h11=35"
+#format 'text' writes the lines as before, format 'binary' writes frames (length, crc32, line) after the header MAGIC
+#With compress each batch is one gzip member, so a crash can only break the member of the batch being written
+#A batch never goes across two files, and read_records drops an incomplete record (a text line without newline,
+#a frame with a wrong length or crc, or the end of a broken gzip member), so a crash never gives a truncated record
+MAGIC = b'BPR1'
+FRAME = struct.Struct('<II')
+GZIP = b'\x1f\x8b\x08'
+#Records are short lines, a frame longer than this is taken as broken without waiting for the rest of the file
+MAX_RECORD = 1 << 20
+
+#File of the given part of a rotated output: out.txt, out.1.txt, out.2.txt, ...
+def part_name(filename, part):
+    if part == 0:
+        return filename
+    directory, name = os.path.split(filename)
+    stem, dot, ext = name.partition('.')
+    return os.path.join(directory, '%s.%d%s%s' % (stem, part, dot, ext))
+
+#Existing files of an output in order
+def sink_files(filename):
+    files, part = [], 0
+    while os.path.exists(part_name(filename, part)):
+        files.append(part_name(filename, part))
+        part += 1
+    return files
+
+#A sink writing to filename, gzip compressed if compress, and continued in a new part once a file has rotate_bytes bytes
+#With append, the records are added after those of an existing output (in its last part, see repair), and otherwise
+#all the parts of an existing output are removed
+def open_sink(filename, format = 'text', compress = False, rotate_bytes = None, append = False, batch = 1000, queue_size = 100):
+    if format not in ['text', 'binary']:
+        raise ValueError('Unknown format %s, should be text or binary' % format)
+    sink = {'filename': filename, 'format': format, 'compress': compress, 'rotate_bytes': rotate_bytes, 'batch': batch,
+            'part': 0, 'file': None, 'header': b'', 'buffer': [], 'records': 0, 'error': None, 'discard': False, 'queue': queue.Queue(queue_size)}
+    if append:
+        sink['part'] = max(len(sink_files(filename)) - 1, 0)
+        repair(sink)
+    else:
+        for name in sink_files(filename)[1:]:
+            os.remove(name)
+    open_part(sink, 'ab' if append else 'wb')
+    sink['thread'] = threading.Thread(target = writer, args = (sink,), daemon = True)
+    sink['thread'].start()
+    return sink
+
+#Prepare the last part of an output for appending after a crash: an uncompressed file is cut back to the end of its
+#last complete record, and a compressed file is only continued if all its members are complete, else a new part is started
+def repair(sink):
+    name = part_name(sink['filename'], sink['part'])
+    if not os.path.exists(name):
+        return
+    if not sink['compress']:
+        length = complete_length(name)
+        if length < os.path.getsize(name):
+            os.truncate(name, length)
+    elif not intact(name):
+        sink['part'] += 1
+
+def open_part(sink, mode):
+    name = part_name(sink['filename'], sink['part'])
+    empty = mode == 'wb' or not os.path.exists(name) or os.path.getsize(name) == 0
+    sink['file'] = open(name, mode)
+    # the header goes with the first batch, inside its gzip member when compressed
+    sink['header'] = MAGIC if sink['format'] == 'binary' and empty else b''
+
+def encode(sink, records):
+    if sink['format'] == 'text':
+        return ''.join(r + '\n' for r in records).encode()
+    frames = []
+    for r in records:
+        payload = r.encode()
+        frames.append(FRAME.pack(len(payload), zlib.crc32(payload)) + payload)
+    return b''.join(frames)
+
+#Write one batch in the current part, after starting a new part if the current one is full
+def write_batch(sink, records):
+    if sink['rotate_bytes'] is not None and os.path.getsize(part_name(sink['filename'], sink['part'])) >= sink['rotate_bytes']:
+        sink['file'].close()
+        sink['part'] += 1
+        open_part(sink, 'wb')
+    data = sink['header'] + encode(sink, records)
+    if sink['compress']:
+        data = gzip.compress(data)
+    sink['file'].write(data)
+    sink['file'].flush()
+    sink['header'] = b''
+
+#Background thread, None in the queue stops it
+def writer(sink):
+    while True:
+        records = sink['queue'].get()
+        try:
+            if records is None:
+                return
+            if sink['error'] is None and not sink['discard']:
+                write_batch(sink, records)
+        except Exception as e:
+            sink['error'] = e
+        finally:
+            sink['queue'].task_done()
+
+def check(sink):
+    if sink['error'] is not None:
+        raise IOError('writing %s failed: %s' % (sink['filename'], sink['error']))
+
+def write(sink, record):
+    check(sink)
+    sink['buffer'].append(record)
+    sink['records'] += 1
+    if len(sink['buffer']) >= sink['batch']:
+        sink['queue'].put(sink['buffer'])
+        sink['buffer'] = []
+
+#Wait until all the records given so far are written, e.g. before saving a checkpoint
+def flush(sink):
+    if sink['buffer']:
+        sink['queue'].put(sink['buffer'])
+        sink['buffer'] = []
+    sink['queue'].join()
+    check(sink)
+
+#Position after the records written so far, the part and its size, to go back to with rewind
+def position(sink):
+    flush(sink)
+    return [sink['part'], os.path.getsize(part_name(sink['filename'], sink['part']))]
+
+#Drop the records written after a position, e.g. those written again by a run resumed from a checkpoint
+def rewind(sink, position):
+    flush(sink)
+    part, size = position
+    sink['file'].close()
+    for name in sink_files(sink['filename'])[part + 1:]:
+        os.remove(name)
+    os.truncate(part_name(sink['filename'], part), size)
+    sink['part'] = part
+    open_part(sink, 'ab')
+
+#With discard, the records which are not written yet are dropped
+def close(sink, discard = False):
+    if discard:
+        sink['discard'] = True
+        sink['buffer'] = []
+    if sink['thread'].is_alive():
+        flush(sink)
+        sink['queue'].put(None)
+        sink['thread'].join()
+    sink['file'].close()
+    check(sink)
+
+#Decompress the gzip member at offset start, reading at most up to the offset limit: its data up to where it is broken,
+#the offset after it and whether it is complete
+def member(file, start, limit = None, size = 1 << 16):
+    file.seek(start)
+    d = zlib.decompressobj(31)
+    data, pos = [], start
+    while not d.eof:
+        raw = file.read(size if limit is None else min(size, limit - pos))
+        if not raw:
+            return b''.join(data), pos, False
+        saved = d.copy()
+        try:
+            data.append(d.decompress(raw))
+        except zlib.error:
+            # again one byte at a time, to keep the data before the error
+            d = saved
+            for i in range(len(raw)):
+                try:
+                    data.append(d.decompress(raw[i:i + 1]))
+                except zlib.error:
+                    return b''.join(data), pos + i, False
+        pos += len(raw)
+    return b''.join(data), pos - len(d.unused_data), True
+
+#Offset of the first complete gzip member after start, None if there is none
+def next_member(file, start, size = 1 << 16):
+    while True:
+        file.seek(start)
+        block = file.read(size)
+        i = block.find(GZIP)
+        if i < 0:
+            if len(block) < size:
+                return None
+            start += size - len(GZIP) + 1
+        elif member(file, start + i)[2]:
+            return start + i
+        else:
+            start += i + 1
+
+#Whether all the gzip members of a file are complete
+def intact(name):
+    end = os.path.getsize(name)
+    with open(name, 'rb') as file:
+        start = 0
+        while start < end:
+            data, start, complete = member(file, start)
+            if not complete:
+                return False
+    return True
+
+#Data of a file in chunks, decompressing the members of a gzip file one after the other. At a broken member None is given
+#after the data before the break, and the reading goes on at the next complete member
+def chunks(name, size = 1 << 20):
+    with open(name, 'rb') as file:
+        if file.read(len(GZIP)) != GZIP:
+            file.seek(0)
+            raw = file.read(size)
+            while raw:
+                yield raw
+                raw = file.read(size)
+            return
+        end = os.path.getsize(name)
+        start = 0
+        while start is not None and start < end:
+            data, stop, complete = member(file, start)
+            if complete:
+                yield data
+                start = stop
+                continue
+            following = next_member(file, start + 1)
+            if following is not None and following < stop:
+                # the bytes of the next member were decoded as if they were part of this one
+                data = member(file, start, following)[0]
+            yield data
+            yield None
+            start = following
+
+#Binary records of data with the offset of their end, returns the length of data used. A frame with a wrong crc or length
+#is skipped one byte at a time until a valid frame, a frame going past the end of data waits for more data unless final
+def frames(data, offset, final):
+    pos = 0
+    while pos + FRAME.size <= len(data):
+        length, crc = FRAME.unpack_from(data, pos)
+        end = pos + FRAME.size + length
+        if end > len(data) and not final and length <= MAX_RECORD:
+            break
+        payload = data[pos + FRAME.size:end]
+        if end > len(data) or zlib.crc32(payload) != crc:
+            pos += 1
+            continue
+        yield payload.decode(), offset + end
+        pos = end
+    return pos
+
+#Text records of data with the offset of their end, returns the length of data used
+def lines(data, offset):
+    records = data.split(b'\n')
+    pos = len(data) - len(records.pop())
+    for line in records:
+        offset += len(line) + 1
+        yield line.decode().rstrip('\r'), offset
+    return pos
+
+#Records of one file in either format, compressed or not, with the offset of their end in the (decompressed) data
+def parse(name):
+    data, offset, binary = b'', 0, None
+    for chunk in chunks(name):
+        if chunk is None:
+            # the incomplete last record of a broken gzip member
+            offset += len(data)
+            data = b''
+            continue
+        data += chunk
+        if binary is None:
+            if len(data) < len(MAGIC):
+                continue
+            binary = data.startswith(MAGIC)
+            if binary:
+                data, offset = data[len(MAGIC):], offset + len(MAGIC)
+        pos = yield from (frames(data, offset, False) if binary else lines(data, offset))
+        data, offset = data[pos:], offset + pos
+    if binary:
+        yield from frames(data, offset, True)
+    elif binary is None:
+        yield from lines(data, offset)
+
+def read_file(name):
+    for record, end in parse(name):
+        yield record
+
+#Length of an uncompressed file up to the end of its last complete record
+def complete_length(name):
+    length = 0
+    for record, length in parse(name):
+        pass
+    return length
+
+#All the records of an output, in all its parts
+def read_records(filename):
+    for name in sink_files(filename):
+        yield from read_file(name)
+
+if __name__ == '__main__':
+    import tempfile
+    import time
+    print('----------test sink.py----------')
+    #test codes
+    records = ['%d: (1,0,0)(0,1,0)(0,0,1)(-1,-1,-1) 4 h11=%d' % (i, i % 50) for i in range(200000)]
+    with tempfile.TemporaryDirectory() as tmp:
+        for format in ['text', 'binary']:
+            for compress in [False, True]:
+                name = os.path.join(tmp, 'out-%s-%s.txt' % (format, compress))
+                start = time.time()
+                sink = open_sink(name, format, compress, rotate_bytes = 10**6)
+                for r in records[:150000]:
+                    write(sink, r)
+                close(sink)
+                sink = open_sink(name, format, compress, rotate_bytes = 10**6, append = True)
+                for r in records[150000:]:
+                    write(sink, r)
+                close(sink)
+                elapsed = time.time() - start
+                files = sink_files(name)
+                same = list(read_records(name)) == records
+                #a crash in the middle of the last record only loses this record
+                last = files[-1]
+                with open(last, 'rb') as file:
+                    data = file.read()
+                with open(last, 'wb') as file:
+                    file.write(data[:-7])
+                truncated = list(read_records(name))
+                complete = len(truncated) >= len(records) - 1 and truncated == records[:len(truncated)]
+                #a crash and then an append keeps the complete records of both runs
+                name = os.path.join(tmp, 'crash-%s-%s.txt' % (format, compress))
+                sink = open_sink(name, format, compress)
+                for r in records[:50]:
+                    write(sink, r)
+                close(sink)
+                with open(name, 'rb') as file:
+                    data = file.read()
+                with open(name, 'wb') as file:
+                    file.write(data[:-7])
+                sink = open_sink(name, format, compress, append = True)
+                for r in records[50:100]:
+                    write(sink, r)
+                close(sink)
+                crash = list(read_records(name))
+                kept = len(crash) - 50
+                crash_complete = kept >= 49 and crash == records[:kept] + records[50:100]
+                print('%s compress=%s: %.2fs, %d files, %d bytes, identical %s, after truncation %d records, all complete %s, after crash and append %d records, all complete %s'
+                      % (format, compress, elapsed, len(files), sum(os.path.getsize(f) for f in files), same, len(truncated), complete, len(crash), crash_complete))
+        #a new output replaces all the parts of an old one
+        name = os.path.join(tmp, 'out-text-False.txt')
+        old = len(sink_files(name))
+        sink = open_sink(name)
+        for r in records[:5]:
+            write(sink, r)
+        close(sink)
+        print('new output over %d files: %d files, %d records' % (old, len(sink_files(name)), len(list(read_records(name)))))
+        start = time.time()
+        with open(os.path.join(tmp, 'print.txt'), 'w') as file:
+            for r in records:
+                print(r, file = file, flush = True)
+        print('print with flush: %.2fs' % (time.time() - start))
+    print('----------test sink.py end----------')
@@ -1,5 +1,6 @@
 import numpy as np
 import math
+from . import kernels
 
 #To control error
 def reduce(x: float):
@@ -40,8 +41,11 @@ def substitute(ineqs, solution, n):
     lowerbound = max([-np.dot(solution, low[:-1])/low[-1] for low in lower])
     return reduce(upperbound),reduce(lowerbound)
 
-#main function
+#main function, the compiled kernel is used when the backend of kernels.py is numba
 def solve(ineqs, n):
+    solutions = kernels.solve(ineqs, n)
+    if solutions is not None:
+        return solutions
     if n==1:
         upper,lower,none = classify(ineqs,n)
         upperbound = min([-up[0]/up[n] for up in upper])
@@ -0,0 +1,166 @@
+import numpy as np
+from math import gcd
+from fractions import Fraction
+from itertools import permutations, combinations
+from .lattice_hull import dual_bounds
+
+def det3(m):
+    return (m[0][0] * (m[1][1] * m[2][2] - m[1][2] * m[2][1]) - m[0][1] * (m[1][0] * m[2][2] - m[1][2] * m[2][0])
+            + m[0][2] * (m[1][0] * m[2][1] - m[1][1] * m[2][0]))
+
+#Transpose of the cofactor matrix, adj(m) m = det(m) I
+def adjugate3(m):
+    return [[m[(j + 1) % 3][(i + 1) % 3] * m[(j + 2) % 3][(i + 2) % 3] - m[(j + 1) % 3][(i + 2) % 3] * m[(j + 2) % 3][(i + 1) % 3] for j in range(3)] for i in range(3)]
+
+#Apply the matrix g to the vertex v
+def act(g, v):
+    return tuple(g[i][0] * v[0] + g[i][1] * v[1] + g[i][2] * v[2] for i in range(3))
+
+#Primitive inner normals u and offsets c of the facets, <u,x> >= c on the polytope
+def lattice_facets(vertices):
+    from scipy.spatial import ConvexHull
+    hull = ConvexHull([[float(x) for x in v] for v in vertices])
+    facets = set()
+    for simplex in hull.simplices:
+        v1, v2, v3 = vertices[simplex[0]], vertices[simplex[1]], vertices[simplex[2]]
+        a = [v2[i] - v1[i] for i in range(3)]
+        b = [v3[i] - v1[i] for i in range(3)]
+        u = [a[1] * b[2] - a[2] * b[1], a[2] * b[0] - a[0] * b[2], a[0] * b[1] - a[1] * b[0]]
+        d = gcd(*u)
+        u = [x // d for x in u]
+        c = sum(u[i] * v1[i] for i in range(3))
+        if any(sum(u[i] * v[i] for i in range(3)) < c for v in vertices):
+            u, c = [-x for x in u], -c
+        facets.add((tuple(u), c))
+    return sorted(facets)
+
+#Vertex-facet pairing matrix, entry (i, j) is the lattice distance of vertex i to facet j
+#Each row, sorted, is an invariant of the vertex under GL(3,Z)
+def vertex_signatures(vertices):
+    facets = lattice_facets(vertices)
+    return [tuple(sorted(sum(u[i] * v[i] for i in range(3)) - c for u, c in facets)) for v in vertices]
+
+#Lattice automorphism group of a polytope containing the origin in the interior: matrices of GL(3,Z) permuting the vertices
+#A basis of three vertices can only be sent to vertices with the same signatures, which fixes the matrix
+def automorphisms(vlist):
+    vertices = [tuple(int(x) for x in v) for v in vlist]
+    vset = set(vertices)
+    signatures = vertex_signatures(vertices)
+    order = sorted(range(len(vertices)), key = lambda i: sum(s == signatures[i] for s in signatures))
+    basis = next(b for b in permutations(order, 3) if det3([vertices[i] for i in b]) != 0)
+    # columns of B are the basis vertices, g = W B^-1 = W adj(B) / det(B)
+    B = [[vertices[basis[c]][r] for c in range(3)] for r in range(3)]
+    d = det3(B)
+    adj = adjugate3(B)
+    candidates = [[w for w in range(len(vertices)) if signatures[w] == signatures[b]] for b in basis]
+    group = []
+    for w0 in candidates[0]:
+        for w1 in candidates[1]:
+            for w2 in candidates[2]:
+                if len({w0, w1, w2}) < 3:
+                    continue
+                W = [[vertices[w][r] for w in (w0, w1, w2)] for r in range(3)]
+                g = [[sum(W[r][m] * adj[m][c] for m in range(3)) for c in range(3)] for r in range(3)]
+                if any(x % d != 0 for row in g for x in row):
+                    continue
+                g = tuple(tuple(x // d for x in row) for row in g)
+                if abs(det3(g)) == 1 and all(act(g, v) in vset for v in vertices):
+                    group.append(g)
+    return group
+
+#Lattice points of the dual polytope {u|<u,v> >= -offset, v in vertices}, as a boolean array on its bounding box and the lower corner
+def dual_grid(vertices, offset):
+    lower, upper = dual_bounds(vertices, offset)
+    x, y, z = np.ogrid[lower[0]:upper[0] + 1, lower[1]:upper[1] + 1, lower[2]:upper[2] + 1]
+    grid = np.ones((len(x), y.shape[1], z.shape[2]), dtype = bool)
+    for v in vertices:
+        grid &= v[0] * x + v[1] * y + v[2] * z >= -offset
+    return grid, np.array(lower, dtype = np.int64)
+
+#Whether the points (rows of an int64 array) are in the grid of dual_grid
+def in_grid(grid, lower, points):
+    index = points - lower
+    inside = ((index >= 0) & (index < grid.shape)).all(axis = -1)
+    result = np.zeros(inside.shape, dtype = bool)
+    result[inside] = grid[tuple(index[inside].T)]
+    return result
+
+#Vertices of the convex hull of the chosen rays
+def polytope_vertices(vlist):
+    from scipy.spatial import ConvexHull
+    points = [tuple(int(x) for x in v) for v in vlist]
+    hull = ConvexHull([[float(x) for x in v] for v in points])
+    return sorted(set(points[i] for i in hull.vertices))
+
+box_cache = {}
+
+#Vertices of the G-polytope of a box, with a basis W of three of them of smallest |det| and its adjugate, computed once per box
+def box_basis(gpoly):
+    key = tuple(sorted(tuple(int(x) for x in v) for v in gpoly))
+    if key not in box_cache:
+        triples = [b for b in combinations(range(len(key)), 3) if det3([key[i] for i in b]) != 0]
+        basis = min(triples, key = lambda b: abs(det3([key[i] for i in b])))
+        # columns of W are the basis vertices
+        W = [[key[basis[c]][r] for c in range(3)] for r in range(3)]
+        box_cache[key] = {'g': np.array(key, dtype = np.int64), 'basis': basis, 'det': det3(W), 'adj': np.array(adjugate3(W), dtype = np.int64)}
+    return box_cache[key]
+
+#Matrices h of GL(3,Z) with h G in the dual D of the polytope P, so that g = h^T sends P into the box, which is the dual of G
+#h sends the basis w0, w1, w2 of G to points u0, u1, u2 of D, with the same gcd of the coordinates of u0 and of u0 x u1
+#and |det(u0, u1, u2)| = |det W|, so h = U adj(W) / det(W) is in GL(3,Z) if it is integral; then the other vertices of G are checked
+def box_images(vertices, gpoly):
+    box = box_basis(gpoly)
+    grid, lower = dual_grid(vertices, 6)
+    D = np.argwhere(grid) + lower
+    Df = D.astype(float)
+    w = [box['g'][i] for i in box['basis']]
+    d = box['det']
+    content = np.gcd.reduce(D, axis = 1)
+    c01 = np.gcd.reduce(np.cross(w[0], w[1]))
+    found = []
+    for u0 in D[content == np.gcd.reduce(w[0])]:
+        C = np.cross(u0, D)
+        second = np.nonzero((np.gcd.reduce(C, axis = 1) == c01) & (content == np.gcd.reduce(w[1])))[0]
+        # det(u0, u1, u2) = <u0 x u1, u2>, exact in floating point for these small integers
+        i, j = np.nonzero(np.abs(C[second].astype(float) @ Df.T) == abs(d))
+        if len(i) == 0:
+            continue
+        U = np.stack([np.broadcast_to(u0, (len(i), 3)), D[second[i]], D[j]], axis = 2)
+        H = U @ box['adj']
+        H = H[(H % d == 0).all(axis = (1, 2))] // d
+        # rows of G h^T are the images h w of the vertices of G
+        found.append(H[in_grid(grid, lower, box['g'] @ H.transpose(0, 2, 1)).all(axis = 1)])
+    return np.concatenate(found)
+
+#Weight factor 1/(number of distinct images g P inside the box, g in GL(3,Z)), as in RGL of 2d/MonteCarlo-2D.nb
+#The matrices g with g P in the box are counted, and each image is given by |Aut(P)| of them, the g with g P = P
+def weight_factor(vlist, gpoly):
+    vertices = polytope_vertices(vlist)
+    vset = set(vertices)
+    # rows of V h are the images h^T v
+    images = np.array(vertices, dtype = np.int64) @ box_images(vertices, gpoly)
+    stabilizer = sum(set(map(tuple, image.tolist())) == vset for image in images)
+    return Fraction(stabilizer, len(images))
+
+#Weight factor function for run_box in run_control.py
+def box_weight(gpoly):
+    box_basis(gpoly)
+    return lambda vlist: weight_factor(vlist, gpoly)
+
+if __name__ == '__main__':
+    print('----------test weight.py----------')
+    #test codes
+    v1 = np.array([1, 0, 0], dtype = object)
+    v2 = np.array([0, 1, 0], dtype = object)
+    v3 = np.array([0, 0, 1], dtype = object)
+    v4 = np.array([-1, -1, -1], dtype = object)
+    gpoly = [v1, v2, v3, v4]
+    # the box of P3 has the symmetric group S4 and -1 does not preserve it
+    print(len(automorphisms(gpoly)))
+    # the automorphisms of the box give 24 images of this polytope in the box, and shears like (x, y, z) -> (x, x + y, z) give 24 others
+    vlist = [np.array(v, dtype = object) for v in [[-6, 14, -3], [-5, 0, -2], [-4, 2, 7], [-4, 9, -6], [-1, 9, -4], [6, -4, -3]]]
+    shear = [np.array([v[0], v[0] + v[1], v[2]], dtype = object) for v in vlist]
+    print(weight_factor(vlist, gpoly), weight_factor(shear, gpoly))
+    cube = [np.array(p, dtype = object) for p in [[1, 0, 0], [0, 1, 0], [0, 0, 1], [-1, 0, 0], [0, -1, 0], [0, 0, -1]]]
+    print(len(automorphisms(cube)))
+    print('----------test weight.py end----------')